@@ -3,130 +3,263 @@
 #how to actually make decisions will be up to other programs
 #written by Henry Chadban from 07/12/2022
 
-import pandas #for reading csv files
+import collections
 import numpy as np #for storing the state of the board
 import pygame
 import pygame.locals
 import sys
-import random
 import os
+import time
 import typing
+from cluedo_board_data import tiles,players,walk_tiles,secret_destinations,load_board,BoardIndex #static description of the board
+from cluedo_engine import CardController,GameEngine,PlayerPositions #game logic, which does not need pygame
+from cluedo_movement import load_movement_graph #precomputed walking distances
+from cluedo_assets import assets #shared cache of images, fonts and text
+from cluedo_profiler import profiler #timings of each stage of a frame, only taken while enabled
+from cluedo_bots import bot_types #bots which can play any seat
 
 #constants
-#list of all static objects
-tiles : list[str] = ['wall','walk','kitchen','dining_room','lounge','hall','study','library','billards','conservatory','ballroom','start_mustard',
-'start_scarlet','start_plum','start_peacock','start_rev_green','start_white','secret_study','secret_lounge','secret_conservatory','secret_kitchen',
-'centre']
-#list of all players
-players : list[str] = ['mustard','scarlet','plum','peacock','rev_green','white']
+#the static sprite drawn on each type of tile, tiles not listed are drawn as space
+static_sprite_names : list[str] = ['wall','walk','centre','secret','space']
+tile_sprite_names : dict[str,str] = {'wall':'wall','centre':'centre'} | {tile_name:'walk' for tile_name in walk_tiles} | {tile_name:'secret' for tile_name in secret_destinations}
+#the number in static_sprite_names of each tile value's sprite, so the sprites of a whole area of the board are found with one lookup
+tile_sprites : np.ndarray = np.array([static_sprite_names.index(tile_sprite_names.get(tile_name,'space')) for tile_name in tiles],dtype=np.uint8)
+max_view_tiles : tuple[int,int] = (40,30) #the most of the board shown at once, in tiles, larger boards are scrolled with the arrow keys
+scroll_tiles : int = 4 #tiles the view moves for each press of an arrow key
+scroll_keys : dict[int,tuple[int,int]] = {pygame.K_LEFT:(-1,0),pygame.K_RIGHT:(1,0),pygame.K_UP:(0,-1),pygame.K_DOWN:(0,1)}
+info_sprite_size : tuple[int,int] = (67,67) #size of the player and card pictures in the info screens, shared through the asset cache
 
 #load the static sprites we are using in this game
+#all sprites come from the shared asset cache, so each image file is only loaded once
 class StaticSprites():
     def __init__(self):
-        self.walk : pygame.Surface = pygame.image.load("cluedo_images/walk.png")
-        self.centre : pygame.Surface = pygame.image.load("cluedo_images/centre.png")
-        self.wall : pygame.Surface = pygame.image.load("cluedo_images/wall.png")
-        self.space : pygame.Surface = pygame.image.load("cluedo_images/space.png")
-        self.secret : pygame.Surface = pygame.image.load("cluedo_images/secret.png")
+        self.walk : pygame.Surface = assets.image("cluedo_images/walk.png")
+        self.centre : pygame.Surface = assets.image("cluedo_images/centre.png")
+        self.wall : pygame.Surface = assets.image("cluedo_images/wall.png")
+        self.space : pygame.Surface = assets.image("cluedo_images/space.png")
+        self.secret : pygame.Surface = assets.image("cluedo_images/secret.png")
 
 #load the sprites of the players
 class PlayerBoardSprites():
     def __init__(self):
-        self.mustard : pygame.Surface = pygame.image.load("cluedo_images/mustard.png").convert_alpha()
-        self.scarlet : pygame.Surface = pygame.image.load("cluedo_images/scarlet.png").convert_alpha()
-        self.peacock : pygame.Surface = pygame.image.load("cluedo_images/peacock.png").convert_alpha()
-        self.rev_green : pygame.Surface = pygame.image.load("cluedo_images/rev_green.png").convert_alpha()
-        self.plum : pygame.Surface = pygame.image.load("cluedo_images/plum.png").convert_alpha()
-        self.white : pygame.Surface = pygame.image.load("cluedo_images/white.png").convert_alpha()
+        self.mustard : pygame.Surface = assets.image("cluedo_images/mustard.png",None,True)
+        self.scarlet : pygame.Surface = assets.image("cluedo_images/scarlet.png",None,True)
+        self.peacock : pygame.Surface = assets.image("cluedo_images/peacock.png",None,True)
+        self.rev_green : pygame.Surface = assets.image("cluedo_images/rev_green.png",None,True)
+        self.plum : pygame.Surface = assets.image("cluedo_images/plum.png",None,True)
+        self.white : pygame.Surface = assets.image("cluedo_images/white.png",None,True)
 
 class PlayerDisplaySprites():
     def __init__(self):
         #for display in the info screens, these will be 67 by 67
-        self.mustard : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/mustard.png").convert_alpha(),(67,67))
-        self.scarlet : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/scarlet.png").convert_alpha(),(67,67))
-        self.peacock : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/peacock.png").convert_alpha(),(67,67))
-        self.rev_green : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/rev_green.png").convert_alpha(),(67,67))
-        self.plum : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/plum.png").convert_alpha(),(67,67))
-        self.white : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/white.png").convert_alpha(),(67,67))
+        self.mustard : pygame.Surface = assets.image("cluedo_images/mustard.png",info_sprite_size,True)
+        self.scarlet : pygame.Surface = assets.image("cluedo_images/scarlet.png",info_sprite_size,True)
+        self.peacock : pygame.Surface = assets.image("cluedo_images/peacock.png",info_sprite_size,True)
+        self.rev_green : pygame.Surface = assets.image("cluedo_images/rev_green.png",info_sprite_size,True)
+        self.plum : pygame.Surface = assets.image("cluedo_images/plum.png",info_sprite_size,True)
+        self.white : pygame.Surface = assets.image("cluedo_images/white.png",info_sprite_size,True)
+
+#the static background of the board, cut into square chunks of tiles
+#a chunk is only drawn the first time part of it is shown, so a board of any size loads in the same time
+#the sprite of every tile is found in one lookup, each chunk's tiles are drawn in one batch, and the chunks shown least recently are dropped once too many are kept
+class BoardChunks():
+    def __init__(self,board_values : np.ndarray,tile_size : int,sprites : StaticSprites,chunk_tiles : int = 16,max_chunks : int = 48):
+        self.tile_size : int = tile_size
+        self.chunk_tiles : int = chunk_tiles #width and height of a chunk in tiles
+        self.chunk_pixels : int = chunk_tiles*tile_size
+        self.max_chunks : int = max_chunks #should be more than can be shown at once
+        self.board_rect : pygame.Rect = pygame.Rect(0,0,board_values.shape[1]*tile_size,board_values.shape[0]*tile_size)
+        self.sprite_numbers : np.ndarray = tile_sprites[board_values] #the sprite of every tile on the board
+        self.sprites : list[pygame.Surface] = [getattr(sprites,sprite_name) for sprite_name in static_sprite_names]
+        self.labels : dict[str,tuple[pygame.Surface,pygame.Rect]] = {} #text drawn over the tiles, and where it goes on the board
+        self.chunks : collections.OrderedDict[tuple[int,int],pygame.Surface] = collections.OrderedDict() #drawn chunks keyed by column and row, most recently shown last
+        self.chunks_drawn : int = 0 #number of times a chunk has been drawn
+
+    #draw text over the tiles with its top left corner at a position on the board, replacing any text of the same name
+    #chunks already drawn under the old or new text are drawn again when they are next shown
+    def set_label(self,name : str,text : pygame.Surface,position : tuple[int,int]):
+        rects : list[pygame.Rect] = [text.get_rect(topleft=position)]
+        if name in self.labels:
+            if self.labels[name][0] is text and self.labels[name][1]==rects[0]: #already drawn
+                return
+            rects.append(self.labels[name][1])
+        self.labels[name] = (text,rects[0])
+        for key in [key for key in self.chunks if self.chunk_rect(key[0],key[1]).collidelist(rects)!=-1]:
+            del self.chunks[key]
+
+    #the area of the board a chunk covers, in pixels
+    def chunk_rect(self,column : int,row : int):
+        return pygame.Rect(column*self.chunk_pixels,row*self.chunk_pixels,self.chunk_pixels,self.chunk_pixels).clip(self.board_rect)
+
+    #a chunk of the background, drawing it if it is not kept
+    def chunk(self,column : int,row : int):
+        key : tuple[int,int] = (column,row)
+        surface : pygame.Surface|None = self.chunks.get(key)
+        if surface is None:
+            surface = self.draw_chunk(column,row)
+            self.chunks[key] = surface
+            if len(self.chunks)>self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end(key)
+        return surface
+
+    #draw the tiles and text of a chunk
+    def draw_chunk(self,column : int,row : int):
+        sprite_numbers : np.ndarray = self.sprite_numbers[row*self.chunk_tiles:(row+1)*self.chunk_tiles,column*self.chunk_tiles:(column+1)*self.chunk_tiles]
+        rect : pygame.Rect = self.chunk_rect(column,row)
+        surface : pygame.Surface = pygame.Surface(rect.size)
+        surface.blits([(self.sprites[sprite_number],(x*self.tile_size,y*self.tile_size)) for y,row_numbers in enumerate(sprite_numbers.tolist())
+                       for x,sprite_number in enumerate(row_numbers)],False)
+        for text,text_rect in self.labels.values():
+            if text_rect.colliderect(rect):
+                surface.blit(text,text_rect.move(-rect.left,-rect.top))
+        self.chunks_drawn = self.chunks_drawn + 1
+        return surface
+
+    #draw an area of the board's background onto a surface, with the area's top left corner at a position
+    def draw(self,target : pygame.Surface,area : pygame.Rect,position : tuple[int,int]):
+        shown : pygame.Rect = area.clip(self.board_rect)
+        if shown.width==0 or shown.height==0:
+            return
+        for row in range(shown.top//self.chunk_pixels,(shown.bottom-1)//self.chunk_pixels+1):
+            for column in range(shown.left//self.chunk_pixels,(shown.right-1)//self.chunk_pixels+1):
+                chunk_area : pygame.Rect = self.chunk_rect(column,row).clip(shown)
+                target.blit(self.chunk(column,row),(position[0]+chunk_area.left-area.left,position[1]+chunk_area.top-area.top),
+                            chunk_area.move(-column*self.chunk_pixels,-row*self.chunk_pixels))
 
 #sprites of the cards
 class CardSprites():
     def __init__(self):
         #these will be 67 by 67
-        self.question : pygame.Surface = pygame.image.load("cluedo_images/question.png") #unknown card
-        #player cards
-        self.mustard : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/mustard.png").convert_alpha(),(67,67))
-        self.scarlet : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/scarlet.png").convert_alpha(),(67,67))
-        self.peacock : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/peacock.png").convert_alpha(),(67,67))
-        self.rev_green : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/rev_green.png").convert_alpha(),(67,67))
-        self.plum : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/plum.png").convert_alpha(),(67,67))
-        self.white : pygame.Surface = pygame.transform(pygame.image.load("cluedo_images/white.png").convert_alpha(),(67,67))
+        self.question : pygame.Surface = assets.image("cluedo_images/question.png") #unknown card
+        #player cards, shared with the info screen sprites
+        self.mustard : pygame.Surface = assets.image("cluedo_images/mustard.png",info_sprite_size,True)
+        self.scarlet : pygame.Surface = assets.image("cluedo_images/scarlet.png",info_sprite_size,True)
+        self.peacock : pygame.Surface = assets.image("cluedo_images/peacock.png",info_sprite_size,True)
+        self.rev_green : pygame.Surface = assets.image("cluedo_images/rev_green.png",info_sprite_size,True)
+        self.plum : pygame.Surface = assets.image("cluedo_images/plum.png",info_sprite_size,True)
+        self.white : pygame.Surface = assets.image("cluedo_images/white.png",info_sprite_size,True)
         #room cards
-        self.billards : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.conservatory : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.ballroom : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.kitchen : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.lounge : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.study : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.hall : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.dining_room : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.library : pygame.Surface = pygame.image.load("cluedo_images/question.png")
+        self.billards : pygame.Surface = self.question
+        self.conservatory : pygame.Surface = self.question
+        self.ballroom : pygame.Surface = self.question
+        self.kitchen : pygame.Surface = self.question
+        self.lounge : pygame.Surface = self.question
+        self.study : pygame.Surface = self.question
+        self.hall : pygame.Surface = self.question
+        self.dining_room : pygame.Surface = self.question
+        self.library : pygame.Surface = self.question
         #weapon cards
-        self.spanner : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.rope : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.dagger : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.lead_piping : pygame.Surface = pygame.image.load("cluedo_images/question.png")
-        self.candlestick : pygame.Surface = pygame.image.load("cluedo_images/question.png")
+        self.spanner : pygame.Surface = self.question
+        self.rope : pygame.Surface = self.question
+        self.dagger : pygame.Surface = self.question
+        self.lead_piping : pygame.Surface = self.question
+        self.candlestick : pygame.Surface = self.question
         
 
-#cludeo is played on a 27 tile wide,25 tile tall board
+#cludeo is played on a 27 tile wide,26 tile tall board
+#the board is a view of the game engine, it only draws the state the engine holds
+#boards larger than max_view_tiles are shown a part at a time, and only the part shown is ever drawn
 class Board():
     #create the board on which the game will be played
-    def __init__(self,board_values : list[list[int]],board_width : int,board_height : int,tile_size : int,debug : bool):
+    def __init__(self,engine : GameEngine,tile_size : int,debug : bool):
         self.name : str = 'board' #name of the object, for debugging purposes
-        self.board_values = board_values #numbers what type of static object each position holds
-        self.board_width : int  = board_width
-        self.board_height : int = board_height
+        self.engine : GameEngine = engine #the game being displayed
+        self.board_values = engine.board_values #numbers what type of static object each position holds
+        self.index : BoardIndex = engine.index #where each type of tile is on the board
+        self.board_width : int  = engine.board_width
+        self.board_height : int = engine.board_height
         self.tile_size : int = tile_size
         self.board_pixel_width : int = self.tile_size*self.board_width #determine the default width in pixels of the board
         self.board_pixel_height : int = self.tile_size*self.board_height #determine the default height in pixels of the board
+        self.view_width : int = min(self.board_width,max_view_tiles[0]) #size of the part of the board shown, in tiles
+        self.view_height : int = min(self.board_height,max_view_tiles[1])
+        self.view_x : int = 0 #the tile at the top left of the part shown
+        self.view_y : int = 0
         self.debug : bool = debug
-        self.create_players_at_start()
         self.setup_rendering()
         self.render_board()
     
     #create the objects involved in rendering the board, and render the static background
     def setup_rendering(self):
-        self.board_surface : pygame.Surface = pygame.Surface((self.board_pixel_width,self.board_pixel_height)) #create a surface of the correct size
+        self.board_surface : pygame.Surface = pygame.Surface((self.view_width*self.tile_size,self.view_height*self.tile_size)) #create a surface the size of the part shown
         self.static_sprites : StaticSprites = StaticSprites() #load the static sprites used in the game
         self.dynamic_sprites : PlayerBoardSprites = PlayerBoardSprites() #load the dynamic sprites used in the game
         self.render_background() #create the background
         
     #render the current board        
     def render_board(self):
-        self.board_surface.blit(self.static_board_surface,(0,0)) #render the background onto the main surface
+        self.static_chunks.draw(self.board_surface,self.view_rect(),(0,0)) #render the background of the part shown onto the main surface
         self.render_players() #render the players onto the background
+        self.drawn_positions : np.ndarray = self.engine.player_positions.snapshot() #where each token was last drawn
+
+    #redraw only the tiles a token has left or arrived on since the last render
+    #returns the rects of the board surface which changed, empty if nothing moved
+    def update_board(self):
+        positions : PlayerPositions = self.engine.player_positions
+        moved : np.ndarray = np.flatnonzero((positions.positions!=self.drawn_positions).any(axis=1)) #seats whose tokens have moved
+        if len(moved)==0:
+            return []
+        changed_tiles : list[tuple[int,int]] = []
+        for seat in moved:
+            for x,y in (self.drawn_positions[seat].tolist(),positions.positions[seat].tolist()):
+                if x>=0 and (x,y) not in changed_tiles:
+                    changed_tiles.append((x,y))
+        dirty_rects : list[pygame.Rect] = []
+        #restore the background of each changed tile, then draw the tokens which are on it
+        for x,y in changed_tiles:
+            if self.in_view(x,y)==False:
+                continue
+            rect : pygame.Rect = self.tile_rect(x,y)
+            self.static_chunks.draw(self.board_surface,pygame.Rect(x*self.tile_size,y*self.tile_size,self.tile_size,self.tile_size),rect.topleft)
+            dirty_rects.append(rect)
+            for seat in positions.seats_at(x,y):
+                self.board_surface.blit(getattr(self.dynamic_sprites,positions.players[seat]),rect)
+        self.drawn_positions = positions.snapshot()
+        return dirty_rects
+
+    #the area of the board shown, in pixels
+    def view_rect(self):
+        return pygame.Rect(self.view_x*self.tile_size,self.view_y*self.tile_size,self.view_width*self.tile_size,self.view_height*self.tile_size)
+
+    #is a tile in the part of the board shown
+    def in_view(self,x : int,y : int):
+        return x>=self.view_x and x<self.view_x+self.view_width and y>=self.view_y and y<self.view_y+self.view_height
+
+    #the rect a tile is drawn in on the board surface
+    def tile_rect(self,x : int,y : int):
+        return pygame.Rect((x-self.view_x)*self.tile_size,(y-self.view_y)*self.tile_size,self.tile_size,self.tile_size)
+
+    #move the part of the board shown by a number of tiles, keeping it on the board
+    #returns whether it moved, the whole board needs drawing again if it did
+    def scroll(self,dx : int,dy : int):
+        view_x : int = max(0,min(self.view_x+dx,self.board_width-self.view_width))
+        view_y : int = max(0,min(self.view_y+dy,self.board_height-self.view_height))
+        if view_x==self.view_x and view_y==self.view_y:
+            return False
+        self.view_x = view_x
+        self.view_y = view_y
+        return True
 
     #render the background of the board
     def render_background(self):
-        self.static_board_surface : pygame.Surface = pygame.Surface((self.board_pixel_width,self.board_pixel_height)) #create a surface of the correct size to be the background
         self.render_static_tiles() #render the tiles on the board
         self.render_room_text() #render the text on the board
 
     #render the text displayed on the rooms
     def render_room_text(self):
-        font : pygame.font = pygame.font.SysFont(None,24)
         black : pygame.Color = pygame.Color(0,0,0)
-        #generate text for each room
-        billards_room_text : pygame.Surface = font.render('Billiards Room',True,black)
-        kitchen_text : pygame.Surface = font.render('Kitchen',True,black)
-        lounge_text : pygame.Surface = font.render('Lounge',True,black)
-        library_text : pygame.Surface = font.render('Library',True,black)
-        hall_text : pygame.Surface = font.render('Hall',True,black)
-        study_text : pygame.Surface = font.render('Study',True,black)
-        ballroom_text : pygame.Surface = font.render('Ballroom',True,black)
-        dining_room_text : pygame.Surface = font.render('Dining Room',True,black)
-        conservatory_text : pygame.Surface = font.render('Conservatory',True,black)
+        #generate text for each room, the font and text are drawn once and cached
+        billards_room_text : pygame.Surface = assets.text('Billiards Room',None,24,True,black)
+        kitchen_text : pygame.Surface = assets.text('Kitchen',None,24,True,black)
+        lounge_text : pygame.Surface = assets.text('Lounge',None,24,True,black)
+        library_text : pygame.Surface = assets.text('Library',None,24,True,black)
+        hall_text : pygame.Surface = assets.text('Hall',None,24,True,black)
+        study_text : pygame.Surface = assets.text('Study',None,24,True,black)
+        ballroom_text : pygame.Surface = assets.text('Ballroom',None,24,True,black)
+        dining_room_text : pygame.Surface = assets.text('Dining Room',None,24,True,black)
+        conservatory_text : pygame.Surface = assets.text('Conservatory',None,24,True,black)
         #now let's render each text at the centre of the respective room
         self.render_at_centre(billards_room_text,black,'billards')
         self.render_at_centre(kitchen_text,black,'kitchen')
@@ -149,136 +282,25 @@ class Board():
         text_height : int  = text.get_height()
         offset_x : int = int(text_width/2)
         offset_y : int = int(text_height/2)
-        self.static_board_surface.blit(text,(centre_x-offset_x,centre_y-offset_y))
+        self.static_chunks.set_label(room_name,text,(centre_x-offset_x,centre_y-offset_y))
         
 
-    #find the pixel coordinates at the centre of a room
-    def find_room_centre(self,room_name : str):    
-        min_x : int = self.board_width
-        min_y : int = self.board_height
-        max_x : int = -1
-        max_y : int = -1
-        scan_x : int = 0
-        scan_y : int = 0
-        centre_x : int = -1
-        centre_y : int = -1
-        #go through all the tiles in the board
-        for row in self.board_values:
-            scan_x = 0
-            for tile_value in row: 
-                tile_text = tiles[tile_value] #find the text of the tile
-                if tile_text==room_name: #we are looking at a tile of the desired room
-                    #check if new minima/maxima found
-                    if scan_x<min_x: #if new minimum
-                        min_x = scan_x #store new minimum
-                    if scan_y<min_y:
-                        min_y = scan_y
-                    if scan_x>max_x: #if new maxima
-                        max_x = scan_x #store new maxima
-                    if scan_y>max_y: 
-                        max_y = scan_y
-                else:
-                    pass
-                scan_x = scan_x + 1 #move onto the next tile in the row
-
-            scan_y = scan_y + 1 #move onto the next row
-
-        if max_x==-1: #if no maxima (and therefore minima) found
-            #return -1 as pixel position to indicate error
-            centre_x = -1
-            centre_y = -1    
-        else:
-            #calculate the central pixel of the room
-            centre_x = int(((min_x+max_x+1)/2)*self.tile_size)
-            centre_y = int(((min_y+max_y+1)/2)*self.tile_size)
+    #find the pixel coordinates at the centre of a room, by looking up its bounding box in the board index
+    def find_room_centre(self,room_name : str):
+        return self.index[room_name].pixel_centre(self.tile_size)
 
-        return centre_x,centre_y
-
-    #render the static tiles that make up the board
+    #find the sprite of every tile on the board in one lookup, the tiles are drawn a chunk at a time as they are shown
     def render_static_tiles(self):
-        x : int = 0 #position of current tile in the board along the x-axis
-        y : int = 0 #position of current tile in the board along the y-axis
-        
-        #self.static_board_surface.set_colourkey((0,0,0)) #background is black
-        for row in self.board_values:
-            x = 0 #reset x position each row
-            for tile in row:
-                x_position : int = x*self.tile_size
-                y_position : int = y*self.tile_size
-                tile_text : str = tiles[int(tile)] #get the text of the tile
-                #select image based on what type of tile we are using
-                if tile_text=='wall':
-                    image : pygame.Surface = self.static_sprites.wall
-                elif tile_text=='walk' or tile_text=='start_mustard' or tile_text=='start_scarlet' or tile_text=='start_plum' or tile_text=='start_peacock' or tile_text=='start_rev_green' or tile_text=='start_white':
-                    image : pygame.Surface = self.static_sprites.walk
-                elif tile_text=='centre':
-                    image : pygame.Surface = self.static_sprites.centre
-                elif tile_text=='secret_study' or tile_text=='secret_lounge' or tile_text=='secret_conservatory' or tile_text=='secret_kitchen':
-                    image : pygame.Surface = self.static_sprites.secret
-                else:
-                    image : pygame.Surface = self.static_sprites.space
-                #render the image in the correct position
-                #rect = image.get_rect() #extract the rect object from the image
-                #
-                self.static_board_surface.blit(image,(x_position,y_position))
-                x = x+1
-
-            y = y+1 #moving down to the next row
+        self.static_chunks : BoardChunks = BoardChunks(self.board_values,self.tile_size,self.static_sprites)
 
     #render the player characters on top of the static board
     def render_players(self):
-        #loop through the player map to find which player is in which tile
-        x : int = 0
-        y : int = 0
-        for row in self.player_map:
-            x = 0 #reset x position after each row
-            for player_text in row:
-                x_position : int = x*self.tile_size
-                y_position : int = y*self.tile_size
-                x = x+1 #update the column, this is earlier due to potential use of continue later
-                #get the relevant image for each player
-                if player_text=='mustard':
-                    image : pygame.Surface = self.dynamic_sprites.mustard
-                elif player_text=='scarlet':
-                    image : pygame.Surface  = self.dynamic_sprites.scarlet
-                elif player_text=='plum':
-                    image : pygame.Surface  = self.dynamic_sprites.plum
-                elif player_text=='peacock':
-                    image : pygame.Surface  = self.dynamic_sprites.peacock
-                elif player_text=='rev_green':
-                    image : pygame.Surface  = self.dynamic_sprites.rev_green
-                elif player_text=='white':
-                    image : pygame.Surface  = self.dynamic_sprites.white
-                else:
-                    continue #we do not need to render an image
-                self.board_surface.blit(image,(x_position,y_position))
-                
-            y = y+1 #update the row
-
-    #create the map of players at their starting positions
-    def create_players_at_start(self):
-        self.player_map : list[list[str]] = []
-        for row in self.board_values:
-            new_row : list[str] = []
-            for tile in row:
-                tile_text : str = tiles[tile] #get the text of the tile
-                if tile_text=='start_mustard':
-                    player : str = 'mustard'
-                elif tile_text=='start_scarlet':
-                    player : str = 'scarlet'
-                elif tile_text=='start_plum':
-                    player : str = 'plum'
-                elif tile_text=='start_peacock':
-                    player : str = 'peacock'
-                elif tile_text=='start_rev_green':
-                    player : str = 'rev_green'
-                elif tile_text=='start_white':
-                    player : str = 'white'
-                else:
-                    player : str = ' ' #placeholder
-                new_row.append(player)
-            self.player_map.append(new_row)
-                
+        for player,(x,y) in self.engine.player_positions.items():
+            if self.in_view(x,y)==False:
+                continue
+            image : pygame.Surface = getattr(self.dynamic_sprites,player) #get the relevant image for each player
+            self.board_surface.blit(image,self.tile_rect(x,y))
+
     def mouse_down(self,x : int,y : int,debug : bool):
         tile_x,tile_y = self.pixel_position_to_tile(x,y) #determine the position of the clicked on tile
         if debug==True:
@@ -288,16 +310,15 @@ class Board():
             print('this is a ',tile_type,' tile')
         
     
-    #convert pixel position on the board to tile position
+    #convert pixel position on the part of the board shown to tile position
     def pixel_position_to_tile(self,x : int,y : int):
-        tile_position_x : int = int(x/self.tile_size)
-        tile_position_y : int = int(y/self.tile_size)
+        tile_position_x : int = self.view_x+int(x/self.tile_size)
+        tile_position_y : int = self.view_y+int(y/self.tile_size)
         return tile_position_x,tile_position_y
 
     #provide the type of tile at a particular position
     def extract_tile_type(self,tile_x : int,tile_y : int):
-        tile_value : int = self.board_values[tile_y,tile_x]
-        tile_type : str = tiles[tile_value]
+        tile_type : str = self.index.tile_type_at(tile_x,tile_y)
         return tile_type
 
 
@@ -306,84 +327,6 @@ class OwnPlayer():
     def __init__(self,debug):
         self.debug : bool = debug #are we in debug mode
 
-#controls the state of cards in the game
-class CardController():
-    #create the list of cards and decide on the murder cards
-    def __init__(self):
-        self.room_cards : list[str] = ["billards","kitchen","lounge","library","hall","study","ballroom","dining_room","conservatory"]
-        self.weapon_cards : list[str] = ["spanner","rope","dagger","lead_piping","candlestick"]
-        self.player_rep_cards : list[str] = ["mustard","scarlet","peacock","rev_green","plum","white"]
-        self.calculate_murder_cards()
-        self.players : list[str] = ['mustard','scarlet','peacock','rev_green','plum','white'] #list of all valid players
-        self.num_players : int = len(self.players)
-
-
-    def calculate_murder_cards(self):
-        #how many cards of each type
-        num_room_cards : int = len(self.room_cards)
-        num_weapon_cards : int = len(self.weapon_cards)
-        num_player_cards : int = len(self.player_rep_cards)
-        #get the murder card index for each room
-        room_card_num : int = random.randint(0,num_room_cards-1)
-        weapon_card_num : int = random.randint(0,num_weapon_cards-1)
-        player_card_num : int = random.randint(0,num_player_cards-1)
-        #extract each murder card and remove it from the list of free cards
-        self.murder_room : str = self.room_cards[room_card_num]
-        del self.room_cards[room_card_num]
-        self.murder_weapon : str = self.weapon_cards[weapon_card_num]
-        del self.weapon_cards[weapon_card_num]
-        self.murder_player : str = self.player_rep_cards[player_card_num]
-        del self.player_rep_cards[player_card_num]
-        self.all_cards_left : list[str] = self.room_cards + self.weapon_cards + self.player_rep_cards
-
-    def assign_cards_to_players(self,player_list : list[str]):
-        #note player list is in order
-        #lists to store which cards players own
-        self.player_cards : list[list[str]] = [[],[],[],[],[],[]]
-        #is each player playing
-        self.player_playing : list[bool] = [False,False,False,False,False,False]
-        num_playing :int = 0
-        for player in player_list:
-            num_playing = num_playing + 1
-            valid_player : bool = False
-            for i in range(self.num_players):
-                if self.players[i]==player:
-                    self.player_playing[i] = True
-                    valid_player = True
-                    break
-                else:
-                    continue
-            if valid_player==False:
-                print("WARNING: INVALID PLAYER ",player," DETECTED")
-                #invalid players cannot play no matter what
-                num_playing = num_playing - 1 #so reverse increment of number of players
-        
-        #now it is time to distribute the cards
-        num_cards_left : int = len(self.all_cards_left)
-        player_to_deal : int = 0 #which player are we dealing at
-        while(num_cards_left>0): #while there are cards left to be dealed
-            card_dealt : bool = False #has a card been dealt yet
-            loops : int = 0
-            while card_dealt==False: #if there are no valid players this may get trapped in an infinite loop
-                if self.player_playing[player_to_deal]==True:
-                    card_dealt = True
-                else:
-                    player_to_deal = player_to_deal + 1
-                    if player_to_deal==6:
-                        loops = loops + 1
-                        player_to_deal = 0
-                    if loops>=2:
-                        print("INFINITE LOOP DETECTED DURING DEALING")
-            new_card_index : int = random.randint(0,num_cards_left-1) #extract random card from the remaining cards
-            new_card : str = self.all_cards_left[new_card_index]
-            del self.all_cards_left[new_card_index] #remove the card from the pile
-            self.player_cards[player_to_deal].append(new_card) #add it to the list of cards each player has
-            player_to_deal = player_to_deal + 1 #next player to deal
-            if player_to_deal==6: #reset player counter once we reach the max number of players
-                player_to_deal = 0
-            num_cards_left = num_cards_left-1 #we have 1 less card on the pile now it has been dealt
-
-
 #controls the overall flow of the game logic
 class GameMaster():
     def __init__(self,board_path : str ='board.csv'):
@@ -392,8 +335,8 @@ class GameMaster():
         board_height : int = board_size[0] #height of the board in tiles, should be 26
         board_width : int = board_size[1] #width of the board in tiles, should be 27
         self.tile_size : int = 32 #number of pixels in a tile
-        self.board_height_pixels : int  = board_height*self.tile_size #height of the playing board in pixels, should be 832
-        self.board_width_pixels : int = board_height*self.tile_size #width of the playing board in pixels, should be 864
+        self.board_height_pixels : int  = min(board_height,max_view_tiles[1])*self.tile_size #height of the part of the board shown in pixels, should be 832
+        self.board_width_pixels : int = min(board_width,max_view_tiles[0])*self.tile_size #width of the part of the board shown in pixels, should be 864
         self.other_player_width_pixels : int = 172 #width of the left sidebar, where players and their cards are displayed
         self.self_player_width_pixels : int = 172 #width of the right sidebar, where your own cards and controls are displayed
         self.screen_default_width : int = self.board_width_pixels + self.other_player_width_pixels + self.self_player_width_pixels #total width, pixels,s of the screen
@@ -403,11 +346,19 @@ class GameMaster():
         self.display_width : int = self.screen_default_width #display width
         self.display_height : int = self.screen_default_height #display height
         self.screen : pygame.Surface =  pygame.Surface((self.screen_default_width,self.screen_default_height)) #screen object on which UI elements are project
-        #create the board object
-        self.board : Board = Board(board_values,board_height,board_width,self.tile_size,self.debug) #create the board object
-        self.card_controller : CardController = CardController()
+        self.full_redraw : bool = True #the whole display needs to be drawn, rather than just what has changed
+        self.overlay_shown : bool = False #are the profiler's timings on the right sidebar
+        self.overlay_drawn_at : float = 0.0 #when the profiler overlay was last drawn
+        self.bots : list|None = None #the bot playing each seat, None until bots are started
+        self.bot_turn_interval : float = 0.3 #seconds between bot turns, so the moves can be followed
+        self.next_bot_turn_at : float = 0.0 #when the next bot turn is due
+        self.display_sprite_sizes : set[tuple[int,int]] = set() #sizes sprites have been scaled to for the current display size
         active_players : list[str] = ['mustard','scarlet','peacock','plum','white'] #currently active players 
-        self.card_controller.assign_cards_to_players(active_players) #assign cards to players 
+        movement = load_movement_graph(board_path,board_values) #walking distances, cached on disk
+        self.engine : GameEngine = GameEngine(board_values,active_players,self.debug,movement) #create the game logic, which also deals the cards
+        self.card_controller : CardController = self.engine.card_controller
+        #create the board object
+        self.board : Board = Board(self.engine,self.tile_size,self.debug) #create the board object
         
 
     #handle events generated by the game
@@ -419,16 +370,94 @@ class GameMaster():
         elif event.type == pygame.VIDEORESIZE:
                 new_size = event.dict['size']
                 self.display_resize(new_size)
+        #the window needs redrawing, for example after being uncovered
+        elif event.type == pygame.VIDEOEXPOSE or event.type == pygame.WINDOWEXPOSED:
+                self.full_redraw = True
         #handle the user clicking down on the mouse
         elif event.type == pygame.MOUSEBUTTONDOWN:
                 self.mouse_down(event)
+        #f3 turns the profiler and its overlay on or off, f4 saves what it has recorded for a trace viewer
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                num_events : int = profiler.export_trace('cluedo_trace.json')
+                print('saved ',num_events,' profiler events to cluedo_trace.json')
+        #the arrow keys move the view around boards too large to show at once
+        elif event.type == pygame.KEYDOWN and event.key in scroll_keys:
+                dx,dy = scroll_keys[event.key]
+                if self.board.scroll(dx*scroll_tiles,dy*scroll_tiles)==True:
+                    self.full_redraw = True
+                    if self.display_resized_flag==True:
+                        self.scale_static_layers()
+
+    #let bots play the game, bots holds the bot for each seat and None for seats which are not playing
+    def start_bots(self,bots : list):
+        self.bots = bots
+        for seat,bot in enumerate(bots):
+            if bot is not None:
+                bot.new_game(self.engine,seat)
+        self.next_bot_turn_at = time.perf_counter()
+
+    #are bots still playing the game
+    def bots_playing(self):
+        return self.bots is not None and self.engine.game_over==False and self.engine.current_seat!=-1
+
+    #play the next bot turn if it is due
+    #a turn takes well under a frame, so playing it between frames keeps the game responsive to input
+    def step_bots(self):
+        if self.bots_playing()==False or time.perf_counter()<self.next_bot_turn_at:
+            return
+        with profiler.measure('turn'):
+            self.engine.play_turn(self.bots)
+        self.next_bot_turn_at = time.perf_counter()+self.bot_turn_interval
+        if self.engine.game_over==True and self.engine.winner!=-1:
+            print(self.engine.seats[self.engine.winner],' wins')
+        elif self.bots_playing()==False:
+            print('nobody wins')
+
+    #milliseconds until the main loop next has something to do without an event, None if it can wait for one
+    def wait_time_ms(self):
+        now : float = time.perf_counter()
+        waits : list[float] = []
+        if self.bots_playing()==True:
+            waits.append(self.next_bot_turn_at-now)
+        if profiler.enabled==True or self.overlay_shown==True:
+            waits.append(self.overlay_drawn_at+0.5-now)
+        if len(waits)==0:
+            return None
+        return max(int(min(waits)*1000),0)
 
     #resize the screen
     def display_resize(self,new_size : list[int]):
         self.display_resized_flag = True #indicate the display has been resized
+        self.full_redraw = True #everything has to be drawn at the new size
         self.new_size : list[int] = new_size #store the new size of the display
         self.display_width = new_size[0] #update display width
         self.display_height = new_size[1] #update display height
+        self.scale_static_layers() #rescale what does not change once, rather than every frame
+        #sprites scaled for the old display size are no longer needed, the shared info sprites are kept
+        assets.discard_scaled_images(self.display_sprite_sizes-{info_sprite_size})
+        self.display_sprite_sizes = set()
+
+    #build the static layers of the screen (board background and sidebars) at the display size
+    def scale_static_layers(self):
+        #built from the static surfaces only, copying the screen would bake in overlays such as the profiler's timings
+        static_screen : pygame.Surface = pygame.Surface((self.screen_default_width,self.screen_default_height)) #the sidebars are a plain black background
+        self.board.static_chunks.draw(static_screen,self.board.view_rect(),(self.other_player_width_pixels,0)) #the part of the board shown, without any tokens
+        self.scaled_static_screen : pygame.Surface = pygame.transform.scale(static_screen,self.new_size)
+
+    #convert a rect on the screen to the rect it covers on the resized display
+    def screen_rect_to_display(self,rect : pygame.Rect):
+        left : int = int(rect.left*(self.display_width/self.screen_default_width))
+        top : int = int(rect.top*(self.display_height/self.screen_default_height))
+        right : int = int(rect.right*(self.display_width/self.screen_default_width))
+        bottom : int = int(rect.bottom*(self.display_height/self.screen_default_height))
+        return pygame.Rect(left,top,right-left,bottom-top)
+
+    #a player's sprite scaled to a given size, rounding means tiles on the display are not all the same size
+    def scaled_sprite(self,player : str,size : tuple[int,int]):
+        self.display_sprite_sizes.add((size[0],size[1]))
+        return assets.image("cluedo_images/"+player+".png",size,True)
 
     def screen_mouse_position(self,x : int,y : int):
         #convert mouse position between display coordinates and screen coordinates
@@ -438,26 +467,88 @@ class GameMaster():
 
 
     #display the contents of the screen on the display
+    #only the areas which have changed are drawn, returns the rects of the display to update
     def display_render(self):
         #project UI elements on the screen
-        self.screen.blit(self.board.board_surface,(self.other_player_width_pixels,0)) #project the board onto the screen
+        with profiler.measure('board'):
+            if self.full_redraw==True:
+                self.board.render_board() #draw the whole of the current state of the game
+                board_rects : list[pygame.Rect] = [self.board.board_surface.get_rect()]
+            else:
+                board_rects : list[pygame.Rect] = self.board.update_board() #draw only the tokens which have moved
+        overlay_rects : list[pygame.Rect] = self.render_profiler_overlay()
+        if len(board_rects)==0 and len(overlay_rects)==0: #nothing has changed
+            return []
+        screen_rects : list[pygame.Rect] = []
+        with profiler.measure('blit'):
+            for board_rect in board_rects:
+                screen_rect : pygame.Rect = board_rect.move(self.other_player_width_pixels,0)
+                self.screen.blit(self.board.board_surface,screen_rect,board_rect) #project the board onto the screen
+                screen_rects.append(screen_rect)
+        full_redraw : bool = self.full_redraw
+        self.full_redraw = False
         #project the screen onto the final display accounting for dynamic resizing
         if self.display_resized_flag==False:
-            self.display.blit(self.screen, (0, 0))
-        elif self.display_resized_flag==True:
-            self.display.blit(pygame.transform.scale(self.screen,self.new_size),(0,0))
+            if full_redraw==True:
+                screen_rects = [self.screen.get_rect()]
+            with profiler.measure('display_blit'):
+                for screen_rect in screen_rects+overlay_rects:
+                    self.display.blit(self.screen,screen_rect,screen_rect)
+            return screen_rects+overlay_rects
+        else:
+            with profiler.measure('scale'):
+                return self.render_scaled(screen_rects,full_redraw,overlay_rects)
+
+    #draw the changed areas straight onto the resized display
+    #the background comes from the static layers scaled at the last resize, only the tokens and the profiler overlay are scaled here
+    def render_scaled(self,screen_rects : list[pygame.Rect],full_redraw : bool,overlay_rects : list[pygame.Rect] = []):
+        if full_redraw==True:
+            self.display.blit(self.scaled_static_screen,(0,0))
+            display_rects : list[pygame.Rect] = [self.display.get_rect()]
+        else:
+            display_rects : list[pygame.Rect] = []
+            for screen_rect in screen_rects:
+                display_rect : pygame.Rect = self.screen_rect_to_display(screen_rect)
+                self.display.blit(self.scaled_static_screen,display_rect,display_rect)
+                display_rects.append(display_rect)
+        #draw the tokens on the changed areas at the display size
+        for player,(x,y) in self.engine.player_positions.items():
+            if self.board.in_view(x,y)==False:
+                continue
+            tile_rect : pygame.Rect = self.board.tile_rect(x,y).move(self.other_player_width_pixels,0)
+            if full_redraw==False and tile_rect.collidelist(screen_rects)==-1:
+                continue
+            display_rect : pygame.Rect = self.screen_rect_to_display(tile_rect)
+            self.display.blit(self.scaled_sprite(player,display_rect.size),display_rect)
+        for overlay_rect in overlay_rects:
+            display_rect : pygame.Rect = self.screen_rect_to_display(overlay_rect)
+            self.display.blit(pygame.transform.scale(self.screen.subsurface(overlay_rect),display_rect.size),display_rect)
+            display_rects.append(display_rect)
+        return display_rects
+
+    #draw the profiler's timings on the right sidebar, at most a few times a second
+    #returns the rects of the screen which changed, empty if the overlay was not redrawn
+    def render_profiler_overlay(self):
+        if profiler.enabled==False and self.overlay_shown==False:
+            return []
+        now : float = time.perf_counter()
+        if self.full_redraw==False and self.overlay_shown==profiler.enabled and now-self.overlay_drawn_at<0.5:
+            return []
+        self.overlay_drawn_at = now
+        self.overlay_shown = profiler.enabled
+        rect : pygame.Rect = pygame.Rect(self.screen_default_width-self.self_player_width_pixels,0,self.self_player_width_pixels,self.screen_default_height)
+        self.screen.fill((0,0,0),rect) #the sidebar background
+        if profiler.enabled==True:
+            white : pygame.Color = pygame.Color(255,255,255)
+            font : pygame.font.Font = assets.font(None,18)
+            lines : list[str] = ['stage  p50  p95  max (ms)']+profiler.summary()
+            for i,line in enumerate(lines):
+                self.screen.blit(font.render(line,True,white),(rect.left+4,rect.top+4+i*16))
+        return [rect]
 
     #extract info about the board
     def extract_board_data(self,board_path : str,tiles : list[str]):
-        board_raw : pandas.DataFrame = pandas.read_csv(board_path,header=None) #extract raw data from the csv file
-        board_size : tuple[int,int] = board_raw.shape #get the dimensions of the board
-        board_values : np.ndarray = np.zeros(board_size)#the board represented as a numpy array, the numbers represent what type of tile occupies each grid-square
-        for i,tile_name in enumerate(tiles): #go through all the types of tiles
-            truth : bool = board_raw==tile_name #find the tiles which are the current type of tile
-            board_values = board_values + truth*i #set the tile number accordingly
-
-        board_values = np.array(board_values,dtype=int) #convert back to a numpy array of ints
-        return board_values,board_size #provide the numeric representation of the boards tiles
+        return load_board(board_path) #provide the numeric representation of the boards tiles
 
     #return the object at the referenced position on the screen
     def return_object_at_position(self,screen_x : int,screen_y : int):
@@ -515,20 +606,36 @@ class GameMaster():
         
 def main():
     pygame.init()  # initialize pygame
-    clock : pygame.time.Clock = pygame.time.Clock() #create a clock to set the frame-rate
     pygame.display.set_caption('Cluedo') #display the game title in the window
     #board = Board("board.csv") #create the board
     #print(board.board_static)
-    gm : GameMaster = GameMaster()
+    gm : GameMaster = GameMaster(sys.argv[2] if len(sys.argv)>2 else 'board.csv') #another board can follow the bots, for example: python cluedo.py deduction big_board.csv
+    if len(sys.argv)>1: #let bots of the given type play every seat, for example: python cluedo.py deduction
+        gm.start_bots([None if playing==False else bot_types[sys.argv[1]]() for playing in gm.card_controller.player_playing])
     printed : bool = False #debug
+    pygame.display.update(gm.display_render()) #draw the first frame
     while True:
-        clock.tick(60)
+        #sleep until something happens, or until the next bot turn or overlay refresh is due
+        timeout : int|None = gm.wait_time_ms()
+        if timeout is None:
+            events : list[pygame.event.Event] = [pygame.event.wait()]
+        else:
+            events : list[pygame.event.Event] = [pygame.event.wait(max(timeout,1))] #a timeout of 0 would wait forever
+        frame_start : int = time.perf_counter_ns()
+        with profiler.measure('events'):
+            for event in events+pygame.event.get():
+                if event.type!=pygame.NOEVENT:
+                    gm.event_handle(event)
+        gm.step_bots() #play a bot turn if one is due, between frames so input is never held up for long
         #bg = pygame.image.load("rock.jpeg")
-        gm.display_render()
+        with profiler.measure('display_render'):
+            dirty_rects : list[pygame.Rect] = gm.display_render()
         #x, y = pygame.mouse.get_pos() #get pixel position of mouse
-        for event in pygame.event.get():
-            gm.event_handle(event)
-        pygame.display.update()
+        if len(dirty_rects)>0: #only send the changed areas to the display
+            with profiler.measure('display_update'):
+                pygame.display.update(dirty_rects)
+        if profiler.enabled==True:
+            profiler.record('frame',frame_start,time.perf_counter_ns())
         #testing
         if gm.debug==True:
             if printed==False:
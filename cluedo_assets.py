@@ -0,0 +1,72 @@
+#this file stores the images, fonts and text used by the renderer, so each is only loaded or drawn once
+#everything is kept in one shared cache, keyed by what was asked for
+
+import pygame
+
+#loads images, fonts and rendered text the first time they are asked for and hands back the same object afterwards
+class AssetCache():
+    def __init__(self):
+        self.images : dict[tuple[str,tuple[int,int]|None,bool],pygame.Surface] = {} #keyed by (path,size,alpha), a size of None is the image as loaded
+        self.fonts : dict[tuple[str|None,int],pygame.font.Font] = {} #keyed by (system font name,size)
+        self.texts : dict[tuple[str,str|None,int,bool,tuple[int,int,int,int]],pygame.Surface] = {} #keyed by (text,font name,size,antialias,colour)
+        self.hits : dict[str,int] = {'images' : 0,'fonts' : 0,'texts' : 0} #requests answered from the cache
+        self.misses : dict[str,int] = {'images' : 0,'fonts' : 0,'texts' : 0} #requests which had to load or draw something
+
+    #an image, scaled to size if one is given
+    #alpha converts the image for fast drawing with transparency, which needs the display to have been created
+    def image(self,path : str,size : tuple[int,int]|None = None,alpha : bool = False):
+        key : tuple[str,tuple[int,int]|None,bool] = (path,None if size is None else (int(size[0]),int(size[1])),alpha)
+        if key in self.images:
+            self.hits['images'] = self.hits['images'] + 1
+            return self.images[key]
+        self.misses['images'] = self.misses['images'] + 1
+        if size is None:
+            surface : pygame.Surface = pygame.image.load(path)
+            if alpha==True:
+                surface = surface.convert_alpha()
+        else:
+            surface : pygame.Surface = pygame.transform.scale(self.image(path,None,alpha),key[1]) #scaled from the shared original
+        self.images[key] = surface
+        return surface
+
+    #a system font, None gives pygame's default font
+    def font(self,name : str|None,size : int):
+        key : tuple[str|None,int] = (name,size)
+        if key in self.fonts:
+            self.hits['fonts'] = self.hits['fonts'] + 1
+            return self.fonts[key]
+        self.misses['fonts'] = self.misses['fonts'] + 1
+        font : pygame.font.Font = pygame.font.SysFont(name,size)
+        self.fonts[key] = font
+        return font
+
+    #a piece of text rendered in a system font
+    def text(self,text : str,name : str|None,size : int,antialias : bool,colour : pygame.Color):
+        key : tuple[str,str|None,int,bool,tuple[int,int,int,int]] = (text,name,size,antialias,tuple(colour))
+        if key in self.texts:
+            self.hits['texts'] = self.hits['texts'] + 1
+            return self.texts[key]
+        self.misses['texts'] = self.misses['texts'] + 1
+        surface : pygame.Surface = self.font(name,size).render(text,antialias,colour)
+        self.texts[key] = surface
+        return surface
+
+    #forget the images scaled to any of the given sizes, for example the sizes drawn at before the display was resized
+    def discard_scaled_images(self,sizes : set[tuple[int,int]]):
+        self.images = {key : surface for key,surface in self.images.items() if key[1] not in sizes}
+
+    #bytes of pixel data held by the cached surfaces
+    def memory_use(self):
+        total : int = 0
+        for surface in list(self.images.values())+list(self.texts.values()):
+            total = total + surface.get_pitch()*surface.get_height()
+        return total
+
+    #hit and miss counts, number of cached items and memory use
+    def report(self):
+        return {'hits' : dict(self.hits),'misses' : dict(self.misses),
+                'images' : len(self.images),'fonts' : len(self.fonts),'texts' : len(self.texts),'bytes' : self.memory_use()}
+
+
+#the cache shared by every part of the renderer
+assets : AssetCache = AssetCache()
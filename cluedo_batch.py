@@ -0,0 +1,204 @@
+#this file simulates many games of cluedo at once, holding the state of every game in numpy arrays
+#each call to step advances every unfinished game by one turn
+#all games use the same built in strategy: head for a room which could be the murder room, suggest cards
+#which could be murder cards, and accuse once only one card of each type is left
+#tokens may share corridor tiles, which the single game engine does not allow
+
+import numpy as np
+from cluedo_board_data import tiles,room_tiles
+from cluedo_movement import MovementGraph,get_movement_graph,unreachable as movement_unreachable
+from cluedo_engine import room_cards,weapon_cards,player_rep_cards,all_cards,deal_many,owners_of_deals,resolve_suggestions
+
+#constants
+num_cards : int = len(all_cards)
+num_seats : int = len(player_rep_cards)
+#index of the first card of each type in all_cards
+weapon_start : int = len(room_cards)
+suspect_start : int = len(room_cards)+len(weapon_cards)
+unreachable : int = 1000 #distance given to places which cannot be reached
+max_roll : int = 12 #highest total of two dice
+
+#the parts of the board the simulation needs, computed once from board_values
+#distances come from the board's MovementGraph, so every move of a turn is found by indexing arrays
+class BatchBoard():
+    def __init__(self,board_values : np.ndarray):
+        self.board_height : int = board_values.shape[0]
+        self.board_width : int = board_values.shape[1]
+        self.num_tiles : int = self.board_height*self.board_width
+        movement : MovementGraph = get_movement_graph(board_values)
+        num_rooms : int = len(room_cards)
+        #rooms are numbered in the same order as the room cards
+        self.room_nodes : np.ndarray = np.array([movement.room_node(room) for room in room_cards],dtype=np.int32) #movement node of each room
+        self.tile_nodes : np.ndarray = movement.node_index.ravel() #movement node of each tile, rooms give the room's node
+        tile_numbers : np.ndarray = np.array([y*self.board_width+x for x,y in movement.tile_positions],dtype=np.int32) #tile of each corridor node
+        #distance from every node into every room, the door tiles are one step away
+        room_rows : np.ndarray = movement.room_distances[self.room_nodes-movement.num_tile_nodes].astype(np.int32)
+        room_rows[room_rows==movement_unreachable] = unreachable
+        self.room_field : np.ndarray = np.full((num_rooms,self.num_tiles),unreachable,dtype=np.int32)
+        self.room_field[:,tile_numbers] = room_rows[:,:movement.num_tile_nodes]
+        self.room_field = self.room_field.reshape(num_rooms,self.board_height,self.board_width)
+        #distance from every room into every other room, leaving a room takes one step
+        self.room_distance : np.ndarray = room_rows[:,self.room_nodes].T.copy()
+        #room reached by the secret passage in each room, -1 if there is none
+        self.secret_passage : np.ndarray = np.full(num_rooms,-1,dtype=np.int32)
+        for source,destination in movement.secret_passages.items():
+            self.secret_passage[room_cards.index(room_tiles[source-movement.num_tile_nodes])] = room_cards.index(room_tiles[destination-movement.num_tile_nodes])
+        #closest_tile[room,node,roll] is the tile a token on node moves to when heading for a room it cannot reach with the roll
+        #the tile in reach closest to the room, the first in reading order if several are as close
+        self.closest_tile : np.ndarray = np.zeros((num_rooms,movement.num_nodes,max_roll+1),dtype=np.int32)
+        for node in range(movement.num_nodes):
+            reached : list[tuple[int,int]] = sorted((distance,reached_node) for reached_node,distance in movement.walk(node,max_roll).items() if reached_node<movement.num_tile_nodes)
+            if len(reached)==0:
+                continue
+            distances : np.ndarray = np.array([distance for distance,reached_node in reached])
+            reached_nodes : np.ndarray = np.array([reached_node for distance,reached_node in reached])
+            #the best tile within each distance, ranking tiles by closeness then node number, which is reading order
+            ranks : np.ndarray = np.minimum.accumulate(room_rows[:,reached_nodes].astype(np.int64)*movement.num_tile_nodes+reached_nodes,axis=1)
+            within : np.ndarray = np.searchsorted(distances,np.arange(max_roll+1),side='right')-1 #last reached tile within each roll
+            best : np.ndarray = ranks[:,np.maximum(within,0)]%movement.num_tile_nodes
+            self.closest_tile[:,node,:] = np.where(within>=0,tile_numbers[best],self.closest_tile[:,node,:])
+        #where each token starts, as a tile number, -1 if the board has no start tile for the seat
+        tile_names : np.ndarray = np.array(tiles)[board_values]
+        self.start_locations : np.ndarray = np.full(num_seats,-1,dtype=np.int32)
+        for seat,player in enumerate(player_rep_cards):
+            starts : np.ndarray = np.argwhere(tile_names=='start_'+player)
+            if len(starts)>0:
+                y,x = starts[0]
+                self.start_locations[seat] = y*self.board_width+x
+
+
+#the state of num_games games of cluedo
+#token locations are tile numbers (y*width+x) in the corridors, or num_tiles+room for a token in a room
+class BatchSimulator():
+    def __init__(self,board_values : np.ndarray,num_games : int,active_players : list[str],seed : int|None = None):
+        self.board : BatchBoard = BatchBoard(board_values)
+        self.num_games : int = num_games
+        self.rng : np.random.Generator = np.random.default_rng(seed)
+        self.active_players : list[str] = [player for player in player_rep_cards if player in active_players]
+        self.player_playing : np.ndarray = np.array([player in active_players for player in player_rep_cards]) #is each seat playing
+        self.playing_seats : np.ndarray = np.flatnonzero(self.player_playing) #seats in dealing and turn order
+        if len(self.playing_seats)==0:
+            raise ValueError('at least one valid player is needed')
+        for seat in self.playing_seats: #seats which are not playing never move, so they can do without a start tile
+            if self.board.start_locations[seat]<0:
+                raise ValueError('the board has no start_'+player_rep_cards[seat]+' tile for a playing seat')
+        self.location : np.ndarray = np.zeros((num_games,num_seats),dtype=np.int32) #where each token is
+        self.envelope : np.ndarray = np.zeros((num_games,3),dtype=np.int32) #murder room, weapon and suspect card indices
+        self.hands : np.ndarray = np.zeros((num_games,num_seats,num_cards),dtype=bool) #cards each seat holds
+        self.card_owner : np.ndarray = np.zeros((num_games,num_cards),dtype=np.int8) #seat holding each card, num_seats for the murder cards
+        self.known : np.ndarray = np.zeros((num_games,num_seats,num_cards),dtype=bool) #cards each seat knows are not murder cards
+        self.current_seat : np.ndarray = np.zeros(num_games,dtype=np.int32) #seat taking the next turn
+        self.turn_number : np.ndarray = np.zeros(num_games,dtype=np.int32)
+        self.done : np.ndarray = np.zeros(num_games,dtype=bool) #has the game finished
+        self.winner : np.ndarray = np.full(num_games,-1,dtype=np.int32) #winning seat of each game
+        self.last_roll : np.ndarray = np.zeros(num_games,dtype=np.int32) #dice roll of each game's last turn
+        self.reset(np.ones(num_games,dtype=bool))
+
+    #start new games in the selected slots
+    def reset(self,selected : np.ndarray):
+        count : int = int(selected.sum())
+        if count==0:
+            return
+        self.location[selected] = self.board.start_locations
+        #deal the cards, the last row of each deal is the murder envelope
+        deals : np.ndarray = deal_many(count,self.active_players,self.rng)
+        self.envelope[selected] = deals[:,num_seats,:3]
+        self.card_owner[selected] = owners_of_deals(deals)
+        hands : np.ndarray = np.zeros((count,num_seats,num_cards),dtype=bool)
+        game,seat,position = np.nonzero(deals[:,:num_seats]>=0)
+        hands[game,seat,deals[game,seat,position]] = True
+        self.hands[selected] = hands
+        self.known[selected] = hands
+        self.current_seat[selected] = self.playing_seats[0]
+        self.turn_number[selected] = 0
+        self.done[selected] = False
+        self.winner[selected] = -1
+
+    #pick a random true entry along the last axis of a boolean array
+    def random_choice(self,options : np.ndarray):
+        scores : np.ndarray = self.rng.random(options.shape)*options
+        return np.argmax(scores,axis=-1)
+
+    #the cards of one type a seat could still believe are murder cards
+    def candidates(self,games : np.ndarray,seats : np.ndarray,start : int,stop : int):
+        return ~self.known[games,seats,start:stop]
+
+    #advance every unfinished game by one turn
+    def step(self):
+        games : np.ndarray = np.flatnonzero(~self.done)
+        if len(games)==0:
+            return
+        board : BatchBoard = self.board
+        seats : np.ndarray = self.current_seat[games]
+        location : np.ndarray = self.location[games,seats]
+        in_room : np.ndarray = location>=board.num_tiles
+        current_room : np.ndarray = np.where(in_room,location-board.num_tiles,0)
+        #move, aiming for a room which could be the murder room
+        target : np.ndarray = self.random_choice(self.candidates(games,seats,0,weapon_start))
+        roll : np.ndarray = self.rng.integers(1,7,len(games))+self.rng.integers(1,7,len(games))
+        self.last_roll[games] = roll
+        tile : np.ndarray = np.where(in_room,0,location)
+        distance : np.ndarray = np.where(in_room,board.room_distance[current_room,target],
+                                         board.room_field[target,tile//board.board_width,tile%board.board_width])
+        secret : np.ndarray = in_room & (board.secret_passage[current_room]==target)
+        enter : np.ndarray = secret | (distance<=roll)
+        new_location : np.ndarray = np.where(enter,board.num_tiles+target,location)
+        walking : np.ndarray = np.flatnonzero(~enter)
+        if len(walking)>0:
+            new_location[walking] = self.walk_towards(tile[walking],in_room[walking],current_room[walking],target[walking],roll[walking])
+        self.location[games,seats] = new_location
+        #suggest if the move ended in a room
+        suggesting : np.ndarray = new_location>=board.num_tiles
+        if suggesting.any():
+            self.suggest(games[suggesting],seats[suggesting],new_location[suggesting]-board.num_tiles)
+        #accuse once only one card of each type is left
+        remaining : np.ndarray = self.known[games,seats]==False
+        certain : np.ndarray = (remaining[:,:weapon_start].sum(axis=1)==1) & (remaining[:,weapon_start:suspect_start].sum(axis=1)==1) & (remaining[:,suspect_start:].sum(axis=1)==1)
+        self.done[games[certain]] = True
+        self.winner[games[certain]] = seats[certain]
+        #pass the turn to the next playing seat
+        next_index : np.ndarray = (np.searchsorted(self.playing_seats,seats,side='right'))%len(self.playing_seats)
+        self.current_seat[games] = self.playing_seats[next_index]
+        self.turn_number[games] += 1
+
+    #move tokens which cannot reach their target this turn as close to it as the roll allows
+    #leaving a room puts the token on a door tile using one step, so both cases are a walk of up to the roll from the token's node
+    def walk_towards(self,tile : np.ndarray,in_room : np.ndarray,current_room : np.ndarray,target : np.ndarray,roll : np.ndarray):
+        board : BatchBoard = self.board
+        node : np.ndarray = np.where(in_room,board.room_nodes[current_room],board.tile_nodes[tile])
+        return board.closest_tile[target,node,roll]
+
+    #resolve suggestions made by the given seats in the given rooms
+    def suggest(self,games : np.ndarray,seats : np.ndarray,room : np.ndarray):
+        count : int = len(games)
+        weapon : np.ndarray = weapon_start+self.random_choice(self.candidates(games,seats,weapon_start,suspect_start))
+        suspect_seat : np.ndarray = self.random_choice(self.candidates(games,seats,suspect_start,num_cards))
+        suspect : np.ndarray = suspect_start+suspect_seat
+        #the suggested player is brought into the room
+        self.location[games,suspect_seat] = self.board.num_tiles+room
+        #check the other seats in turn order for a card to show
+        cards : np.ndarray = np.stack([room,weapon,suspect],axis=1)
+        refuters,matching = resolve_suggestions(self.card_owner,games,seats,cards)
+        refuted : np.ndarray = refuters!=-1
+        shown : np.ndarray = cards[np.arange(count),self.random_choice(matching)]
+        shown_games : np.ndarray = games[refuted]
+        self.known[shown_games,seats[refuted],shown[refuted]] = True
+        #if nobody refuted, every suggested card the suggester does not hold is a murder card
+        #so every other card of that type is known not to be
+        unrefuted : np.ndarray = np.flatnonzero(~refuted)
+        for column,start,stop in ((0,0,weapon_start),(1,weapon_start,suspect_start),(2,suspect_start,num_cards)):
+            card : np.ndarray = cards[unrefuted,column]
+            solved : np.ndarray = ~self.hands[games[unrefuted],seats[unrefuted],card]
+            solved_games : np.ndarray = unrefuted[solved]
+            others : np.ndarray = np.zeros((len(solved_games),num_cards),dtype=bool)
+            others[:,start:stop] = True
+            others[np.arange(len(solved_games)),cards[solved_games,column]] = False
+            self.known[games[solved_games],seats[solved_games]] |= others
+
+    #step until every game has finished or the turn limit is reached, returns the winning seat of each game
+    def run(self,max_turns : int = 1000):
+        while self.done.all()==False:
+            self.step()
+            out_of_turns : np.ndarray = (self.turn_number>=max_turns) & ~self.done
+            self.done[out_of_turns] = True
+        return self.winner
@@ -0,0 +1,205 @@
+#this file times the expensive parts of the game so changes can be compared
+#it runs without a screen by using sdl's dummy video driver
+#run with: python cluedo_benchmark.py --output results.json
+#and compare two runs with: python cluedo_benchmark.py --compare old.json new.json
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER','dummy') #must be set before pygame creates a display
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import typing
+import numpy as np
+import pygame
+import cluedo
+from cluedo_board_data import tiles,room_tiles,load_board,write_board_csv
+from cluedo_board_generator import generate_board
+from cluedo_engine import CardController,GameEngine,deal_many,player_rep_cards
+from cluedo_movement import load_movement_graph
+from cluedo_bots import bot_types
+
+#time a function over a number of calls, returning the mean time per call in microseconds
+def time_call(function : typing.Callable,repeats : int):
+    start : float = time.perf_counter()
+    for i in range(repeats):
+        function()
+    return (time.perf_counter()-start)/repeats*1e6
+
+#create the game master without its debugging output
+def quiet_game_master(board_path : str = 'board.csv'):
+    with contextlib.redirect_stdout(io.StringIO()):
+        game_master : cluedo.GameMaster = cluedo.GameMaster(board_path)
+    game_master.debug = False
+    game_master.board.debug = False
+    return game_master
+
+#time loading the board and building the parts of the board renderer
+def benchmark_board(repeats : int = 20):
+    game_master : cluedo.GameMaster = quiet_game_master()
+    board : cluedo.Board = game_master.board
+    results : dict[str,float] = {}
+    results['extract_board_data_us'] = time_call(lambda: game_master.extract_board_data('board.csv',tiles),repeats)
+    results['board_init_us'] = time_call(lambda: cluedo.Board(game_master.engine,game_master.tile_size,False),repeats)
+    results['find_room_centre_us'] = time_call(lambda: [board.find_room_centre(room) for room in room_tiles],repeats*10)
+    results['render_room_text_us'] = time_call(board.render_room_text,repeats)
+    #the tiles are only drawn when a chunk is first shown, so time making the chunks together with drawing the view
+    #a separate board is used, as making new chunks throws away the room text drawn on the shown board
+    tiles_board : cluedo.Board = cluedo.Board(game_master.engine,game_master.tile_size,False)
+    def draw_static_tiles():
+        tiles_board.render_static_tiles()
+        tiles_board.render_board()
+    results['render_static_tiles_us'] = time_call(draw_static_tiles,repeats)
+    results['render_board_us'] = time_call(board.render_board,repeats*10)
+    #drawing the view from nothing, as the first frame does
+    def draw_view():
+        board.render_background()
+        board.render_board()
+    results['draw_view_us'] = time_call(draw_view,repeats)
+    return results
+
+#time loading generated boards of increasing size, drawing the first frame, and drawing a frame while a token moves
+#only the part of the board shown is drawn, so these should barely grow with the board, 118 tiles a side is about 1000 movement nodes
+def benchmark_board_sizes(sizes : list[int] = [27,100,118,300],frames : int = 100):
+    results : dict[str,float] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            board_path : str = os.path.join(directory,'board_'+str(size)+'.csv')
+            write_board_csv(generate_board(size,size),board_path)
+            name : str = 'board_'+str(size)+'_'
+            start : float = time.perf_counter()
+            game_master : cluedo.GameMaster = quiet_game_master(board_path)
+            results[name+'load_us'] = (time.perf_counter()-start)*1e6
+            results[name+'first_frame_us'] = time_call(game_master.display_render,1)
+            board : cluedo.Board = game_master.board
+            start_x,start_y = game_master.engine.player_positions.position(0)
+            board.scroll(start_x-board.view_width//2,start_y-board.view_height//2) #show the first token, which is moved around the tiles near it
+            game_master.full_redraw = True
+            game_master.display_render()
+            tiles_to_visit : list[tuple[int,int]] = [tile for tile in game_master.engine.movement.tile_positions if board.in_view(tile[0],tile[1])]
+            moves : list[int] = [0]
+            def move_and_render():
+                x,y = tiles_to_visit[moves[0]%len(tiles_to_visit)]
+                game_master.engine.move_to_tile(0,x,y)
+                moves[0] = moves[0]+1
+                game_master.display_render()
+            results[name+'frame_us'] = time_call(move_and_render,frames)
+    return results
+
+#time a frame of display_render while a token moves every frame
+#the old path rescaled the whole screen every frame once the window was resized, it is timed alongside for comparison
+def benchmark_display_render(frames : int = 300,resized_size : tuple[int,int] = (1920,1200)):
+    game_master : cluedo.GameMaster = quiet_game_master()
+    engine = game_master.engine
+    tiles_to_visit : list[tuple[int,int]] = list(engine.movement.tile_positions)
+    moves : list[int] = [0]
+    #move the first token to the next tile, so every frame has something to draw
+    def move_and_render():
+        x,y = tiles_to_visit[moves[0]%len(tiles_to_visit)]
+        engine.move_to_tile(0,x,y)
+        moves[0] = moves[0]+1
+        game_master.display_render()
+    results : dict[str,float] = {}
+    game_master.display_render()
+    results['display_render_us'] = time_call(move_and_render,frames)
+    results['display_render_idle_us'] = time_call(game_master.display_render,frames)
+    game_master.display = pygame.display.set_mode(resized_size,pygame.RESIZABLE)
+    game_master.display_resize(resized_size)
+    game_master.display_render()
+    results['display_render_resized_us'] = time_call(move_and_render,frames)
+    results['full_screen_rescale_us'] = time_call(lambda: game_master.display.blit(pygame.transform.scale(game_master.screen,resized_size),(0,0)),frames)
+    results['display_resize_us'] = time_call(lambda: game_master.display_resize(resized_size),10)
+    return results
+
+#time dealing a game, one at a time and in bulk
+def benchmark_dealing(repeats : int = 5000,bulk_deals : int = 100000):
+    active_players : list[str] = ['mustard','scarlet','peacock','plum','white']
+    rng : random.Random = random.Random(0)
+    #calculate_murder_cards is called when the card controller is created
+    def deal():
+        card_controller : CardController = CardController(rng)
+        card_controller.assign_cards_to_players(active_players)
+    results : dict[str,float] = {}
+    results['deal_us'] = time_call(deal,repeats)
+    generator : np.random.Generator = np.random.default_rng(0)
+    results['deal_many_per_deal_us'] = time_call(lambda: deal_many(bulk_deals,active_players,generator),1)/bulk_deals
+    return results
+
+#play whole games without rendering, for each type of bot
+def benchmark_games(num_games : int = 200,num_players : int = 5):
+    board_values,board_size = load_board('board.csv')
+    movement = load_movement_graph('board.csv',board_values)
+    active_players : list[str] = player_rep_cards[:num_players]
+    results : dict[str,float] = {}
+    for name,bot_type in bot_types.items():
+        turns : int = 0
+        start : float = time.perf_counter()
+        for game in range(num_games):
+            engine : GameEngine = GameEngine(board_values,active_players,False,movement,game)
+            engine.play_game([bot_type() if playing==True else None for playing in engine.card_controller.player_playing])
+            turns = turns + engine.turn_number
+        elapsed : float = time.perf_counter()-start
+        results[name+'_games_per_s'] = num_games/elapsed
+        results[name+'_turns_per_s'] = turns/elapsed
+    return results
+
+#run every benchmark, along with what they were run on
+def run_all(quick : bool = False):
+    scale : int = 10 if quick==True else 1 #quick runs do a tenth of the work
+    results : dict[str,float] = {}
+    results.update(benchmark_board(max(20//scale,2)))
+    results.update(benchmark_display_render(300//scale))
+    results.update(benchmark_board_sizes(frames=100//scale))
+    results.update(benchmark_dealing(5000//scale,100000//scale))
+    results.update(benchmark_games(200//scale))
+    return {'commit' : current_commit(),'python' : platform.python_version(),'pygame' : pygame.version.ver,
+            'numpy' : np.__version__,'platform' : platform.platform(),'time' : time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results' : results}
+
+#the git commit being benchmarked, None outside a git checkout
+def current_commit():
+    try:
+        return subprocess.run(['git','rev-parse','--short','HEAD'],capture_output=True,text=True,check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+#print how each result changed between two runs, times ending in _us are better lower and rates ending in _per_s better higher
+def compare(old : dict,new : dict):
+    print('benchmark',' ',old['commit'],' -> ',new['commit'])
+    for name,new_value in new['results'].items():
+        if name not in old['results']:
+            print(name,' = ',round(new_value,2),' (new)')
+            continue
+        old_value : float = old['results'][name]
+        change : float = (new_value-old_value)/old_value*100
+        print(name,' = ',round(old_value,2),' -> ',round(new_value,2),' (',round(change,1),'%)')
+
+def main():
+    parser : argparse.ArgumentParser = argparse.ArgumentParser(description='time the game engine and renderer')
+    parser.add_argument('--output',help='write the results to this json file')
+    parser.add_argument('--quick',action='store_true',help='do less work, for a rough check')
+    parser.add_argument('--compare',nargs=2,metavar=('OLD','NEW'),help='compare two result files instead of running')
+    arguments = parser.parse_args()
+    if arguments.compare is not None:
+        with open(arguments.compare[0]) as file:
+            old : dict = json.load(file)
+        with open(arguments.compare[1]) as file:
+            new : dict = json.load(file)
+        compare(old,new)
+        return
+    pygame.init()
+    report : dict = run_all(arguments.quick)
+    for name,value in report['results'].items():
+        print(name,' = ',round(value,2))
+    if arguments.output is not None:
+        with open(arguments.output,'w') as file:
+            json.dump(report,file,indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#this file stores the static description of the cluedo board
+#it does not depend on pygame, so it can be used by headless simulations as well as the renderer
+
+import csv #for reading board files
+import hashlib #for fingerprinting board files
+import os
+import numpy as np #for storing the state of the board
+
+#constants
+#list of all static objects
+tiles : list[str] = ['wall','walk','kitchen','dining_room','lounge','hall','study','library','billards','conservatory','ballroom','start_mustard',
+'start_scarlet','start_plum','start_peacock','start_rev_green','start_white','secret_study','secret_lounge','secret_conservatory','secret_kitchen',
+'centre']
+#list of all players
+players : list[str] = ['mustard','scarlet','plum','peacock','rev_green','white']
+#numeric value of each tile type
+tile_values : dict[str,int] = {tile_name : i for i,tile_name in enumerate(tiles)}
+#tiles a player can stand on outside of the rooms
+walk_tiles : list[str] = ['walk','start_mustard','start_scarlet','start_plum','start_peacock','start_rev_green','start_white']
+#tiles which make up the rooms
+room_tiles : list[str] = ['kitchen','dining_room','lounge','hall','study','library','billards','conservatory','ballroom']
+#the room each secret passage leads to, the passage tile itself sits inside another room
+secret_destinations : dict[str,str] = {'secret_study':'study','secret_lounge':'lounge','secret_conservatory':'conservatory','secret_kitchen':'kitchen'}
+#the tile each player starts the game on
+start_tiles : dict[str,str] = {player : 'start_'+player for player in players}
+
+#read the tile names in a csv file into a grid of tile values, one byte per tile
+def parse_board_csv(board_path : str):
+    with open(board_path,newline='') as board_file:
+        rows : list[list[str]] = [row for row in csv.reader(board_file) if len(row)>0]
+    board_values : np.ndarray = np.zeros((len(rows),len(rows[0])),dtype=np.uint8)
+    for y,row in enumerate(rows):
+        for x,tile_name in enumerate(row):
+            if tile_name in tile_values:
+                board_values[y,x] = tile_values[tile_name]
+            else:
+                print("WARNING: UNKNOWN TILE ",tile_name," TREATED AS WALL")
+    return board_values
+
+#write a grid of tile values as a csv file of tile names, the format parse_board_csv reads
+def write_board_csv(board_values : np.ndarray,board_path : str):
+    tile_names : np.ndarray = np.array(tiles)[board_values]
+    with open(board_path,'w',newline='') as board_file:
+        csv.writer(board_file).writerows(tile_names.tolist())
+
+#parse a board file and write its compiled form, a uint8 .npy grid which can be memory mapped
+#the parsed grid is returned, so the board can still be used when the cache folder can not be written to
+def compile_board(board_path : str,board_hash : str|None = None):
+    board_values : np.ndarray = parse_board_csv(board_path)
+    try:
+        save_cache_file(cache_path(board_path,'board','.npy',board_hash),board_values)
+    except OSError:
+        pass #the board is parsed again next time
+    return board_values
+
+#extract the numeric representation of the board from a csv file
+#the csv is only parsed the first time it is seen, after that the compiled grid is memory mapped
+def load_board(board_path : str,board_hash : str|None = None):
+    try:
+        #the board as a read only array backed by the mapped file, the numbers represent what type of tile occupies each grid-square
+        board_values : np.ndarray = np.load(cache_path(board_path,'board','.npy',board_hash),mmap_mode='r')
+    except (OSError,ValueError,EOFError): #not compiled yet, or the compiled file can not be read
+        board_values = compile_board(board_path,board_hash)
+        board_values.flags.writeable = False
+    board_values = np.asarray(board_values) #viewed as a plain ndarray since indexing a numpy memmap is slower
+    board_size : tuple[int,int] = board_values.shape #get the dimensions of the board
+    return board_values,board_size #provide the numeric representation of the boards tiles
+
+#a short fingerprint of a board file's contents, used to name cached data derived from it
+def board_file_hash(board_path : str):
+    with open(board_path,'rb') as board_file:
+        return hashlib.sha256(board_file.read()).hexdigest()[:16]
+
+#path to store cached data derived from a board file, kept in a .cluedo_cache folder beside the board
+#the name includes the hash of the board, so editing the board file makes old caches unused
+#pass board_hash when it is already known, so the board file is not read again
+def cache_path(board_path : str,kind : str,extension : str,board_hash : str|None = None):
+    if board_hash is None:
+        board_hash = board_file_hash(board_path)
+    return os.path.join(os.path.dirname(os.path.abspath(board_path)),'.cluedo_cache',kind+'_'+board_hash+extension)
+
+#write an array to a cache file as a .npy, making the cache folder if needed, raises OSError if it can not be written
+def save_cache_file(path : str,array : np.ndarray):
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    temporary_path : str = path+'.'+str(os.getpid())+'.tmp' #write then rename, so other processes never read half a file
+    try:
+        with open(temporary_path,'wb') as cache_file:
+            np.save(cache_file,array)
+        os.replace(temporary_path,path)
+    except OSError:
+        if os.path.exists(temporary_path)==True:
+            os.remove(temporary_path)
+        raise
+
+#where the tiles of one type are on the board
+class TileGeometry():
+    def __init__(self,tile_name : str):
+        self.tile_name : str = tile_name
+        self.tiles : list[tuple[int,int]] = [] #position of every tile of this type, in reading order
+        self.min_x : int = -1 #bounding box, -1 if there are no tiles of this type
+        self.min_y : int = -1
+        self.max_x : int = -1
+        self.max_y : int = -1
+        self.entrances : list[tuple[int,int]] = [] #for rooms, the room tiles next to a walkable tile
+        self.doors : list[tuple[int,int]] = [] #for rooms, the walkable tiles next to the room
+        self.secret_passage : str|None = None #for rooms, the room reached by the secret passage inside it
+        self.host_room : str|None = None #for secret passages, the room the passage sits in
+
+    #number of tiles of this type
+    def count(self):
+        return len(self.tiles)
+
+    #the pixel coordinates at the centre of the bounding box, -1,-1 if there are no tiles of this type
+    def pixel_centre(self,tile_size : int):
+        if self.max_x==-1:
+            return -1,-1
+        centre_x : int = int(((self.min_x+self.max_x+1)/2)*tile_size)
+        centre_y : int = int(((self.min_y+self.max_y+1)/2)*tile_size)
+        return centre_x,centre_y
+
+
+#the geometry of every tile type on a board
+#the tiles are grouped by type with numpy, so only the doors and secret passages are looked at one by one
+class BoardIndex():
+    def __init__(self,board_values : np.ndarray):
+        self.board_height : int = board_values.shape[0]
+        self.board_width : int = board_values.shape[1]
+        self.geometry : dict[str,TileGeometry] = {tile_name : TileGeometry(tile_name) for tile_name in tiles}
+        self.tile_names : list[list[str]] = np.array(tiles,dtype=object)[board_values].tolist() #name of the tile at each position
+        #which tiles have a walkable tile directly above, below, left or right of them
+        walkable : np.ndarray = np.pad(np.isin(board_values,[tile_values[tile_name] for tile_name in walk_tiles]),1) #a border of unwalkable tiles stands in for the edge
+        next_to_walkable : np.ndarray = (walkable[:-2,1:-1] | walkable[2:,1:-1] | walkable[1:-1,:-2] | walkable[1:-1,2:]).ravel()
+        #the positions of the tiles of each type, in reading order
+        flat_values : np.ndarray = board_values.ravel()
+        order : np.ndarray = np.argsort(flat_values,kind='stable')
+        counts : np.ndarray = np.bincount(flat_values,minlength=len(tiles))
+        ends : np.ndarray = np.cumsum(counts)
+        for tile_value,tile_name in enumerate(tiles):
+            positions : np.ndarray = order[ends[tile_value]-counts[tile_value]:ends[tile_value]]
+            if len(positions)==0:
+                continue
+            geometry : TileGeometry = self.geometry[tile_name]
+            xs : np.ndarray = positions%self.board_width
+            ys : np.ndarray = positions//self.board_width
+            geometry.tiles = list(zip(xs.tolist(),ys.tolist()))
+            geometry.min_x,geometry.min_y,geometry.max_x,geometry.max_y = int(xs.min()),int(ys[0]),int(xs.max()),int(ys[-1])
+            if tile_name in room_tiles:
+                entrances : np.ndarray = next_to_walkable[positions]
+                geometry.entrances = list(zip(xs[entrances].tolist(),ys[entrances].tolist()))
+        #the doors of each room, looking around its entrances above, below, left then right
+        for room in room_tiles:
+            geometry : TileGeometry = self.geometry[room]
+            for x,y in geometry.entrances:
+                for neighbour_x,neighbour_y in self.neighbours(x,y):
+                    if self.tile_names[neighbour_y][neighbour_x] in walk_tiles and (neighbour_x,neighbour_y) not in geometry.doors:
+                        geometry.doors.append((neighbour_x,neighbour_y))
+        #the room around each secret passage, the first room tile found next to it
+        for secret_tile,destination in secret_destinations.items():
+            geometry : TileGeometry = self.geometry[secret_tile]
+            for x,y in geometry.tiles:
+                for neighbour_x,neighbour_y in self.neighbours(x,y):
+                    neighbour_name : str = self.tile_names[neighbour_y][neighbour_x]
+                    if neighbour_name in room_tiles and geometry.host_room is None:
+                        geometry.host_room = neighbour_name
+                        self.geometry[neighbour_name].secret_passage = destination
+
+    #positions directly above, below, left and right of a position which are on the board
+    def neighbours(self,x : int,y : int):
+        return [(neighbour_x,neighbour_y) for neighbour_x,neighbour_y in ((x,y-1),(x,y+1),(x-1,y),(x+1,y))
+                if neighbour_x>=0 and neighbour_x<self.board_width and neighbour_y>=0 and neighbour_y<self.board_height]
+
+    #the geometry of the tiles of one type
+    def __getitem__(self,tile_name : str):
+        return self.geometry[tile_name]
+
+    #the name of the tile at a position
+    def tile_type_at(self,x : int,y : int):
+        return self.tile_names[y][x]
+
+    #the room a position is in, secret passages belong to the room around them, None outside the rooms
+    def room_at(self,x : int,y : int):
+        tile_name : str = self.tile_names[y][x]
+        if tile_name in room_tiles:
+            return tile_name
+        if tile_name in secret_destinations:
+            return self.geometry[tile_name].host_room
+        return None
+
+
+#board indexes already built in this process, keyed by the board they describe
+built_indexes : dict[bytes,BoardIndex] = {}
+
+#the index of a board, built once per process and shared
+def get_board_index(board_values : np.ndarray):
+    key : bytes = str(board_values.shape).encode()+board_values.tobytes()
+    if key not in built_indexes:
+        built_indexes[key] = BoardIndex(board_values)
+    return built_indexes[key]
@@ -0,0 +1,92 @@
+#this file generates cluedo boards of any size, for testing how the game and renderer scale with the board
+#the nine rooms are laid out on a three by three grid, with corridors two tiles wide running between them
+#every room has a door onto each corridor beside it, the corner rooms hold the secret passages and the start tiles are where the corridors meet the edge
+#write a board with: python cluedo_board_generator.py big_board.csv --width 200 --height 150 --seed 1
+
+import argparse
+import numpy as np
+from cluedo_board_data import tile_values,players,start_tiles,write_board_csv
+
+#constants
+#the room in each cell of the grid, top row first
+room_layout : list[list[str]] = [['lounge','dining_room','kitchen'],['hall','billards','ballroom'],['study','library','conservatory']]
+#the secret passage in each corner room, each leads to the room in the opposite corner
+corner_passages : dict[str,str] = {'lounge':'secret_conservatory','kitchen':'secret_study','study':'secret_kitchen','conservatory':'secret_lounge'}
+corridor_width : int = 2
+min_board_size : int = 18 #below this the rooms would not fit between the corridors
+
+#split the tiles between two border walls into three cells and the two corridors between them
+#returns the first and one past the last tile of each cell, and the first tile of each corridor
+def split_cells(length : int):
+    inside : int = length-2-2*corridor_width
+    cell_sizes : list[int] = [inside//3+(1 if i<inside%3 else 0) for i in range(3)]
+    cells : list[tuple[int,int]] = []
+    corridors : list[int] = []
+    start : int = 1
+    for i,cell_size in enumerate(cell_sizes):
+        cells.append((start,start+cell_size))
+        start = start+cell_size
+        if i<2:
+            corridors.append(start)
+            start = start+corridor_width
+    return cells,corridors
+
+#a board of the given size in tiles as a grid of tile values, the same seed always gives the same board
+def generate_board(width : int,height : int,seed : int = 0):
+    if width<min_board_size or height<min_board_size:
+        raise ValueError('boards must be at least '+str(min_board_size)+' tiles wide and tall')
+    rng : np.random.Generator = np.random.default_rng(seed)
+    board_values : np.ndarray = np.full((height,width),tile_values['wall'],dtype=np.uint8)
+    column_cells,column_corridors = split_cells(width)
+    row_cells,row_corridors = split_cells(height)
+    for x in column_corridors:
+        board_values[1:height-1,x:x+corridor_width] = tile_values['walk']
+    for y in row_corridors:
+        board_values[y:y+corridor_width,1:width-1] = tile_values['walk']
+    for row,(cell_top,cell_bottom) in enumerate(row_cells):
+        for column,(cell_left,cell_right) in enumerate(column_cells):
+            room : str = room_layout[row][column]
+            #the room is the cell less a wall on each side, shrunk by a random amount so boards are not all alike
+            left : int = cell_left+1+int(rng.integers(0,max((cell_right-cell_left)//6,1)))
+            right : int = cell_right-1-int(rng.integers(0,max((cell_right-cell_left)//6,1)))
+            top : int = cell_top+1+int(rng.integers(0,max((cell_bottom-cell_top)//6,1)))
+            bottom : int = cell_bottom-1-int(rng.integers(0,max((cell_bottom-cell_top)//6,1)))
+            board_values[top:bottom,left:right] = tile_values[room]
+            #a door on each side facing a corridor, walking from the corridor up to the room
+            door_x : int = int(rng.integers(left,right))
+            door_y : int = int(rng.integers(top,bottom))
+            if row>0:
+                board_values[cell_top:top,door_x] = tile_values['walk']
+            if row<2:
+                board_values[bottom:cell_bottom,door_x] = tile_values['walk']
+            if column>0:
+                board_values[door_y,cell_left:left] = tile_values['walk']
+            if column<2:
+                board_values[door_y,right:cell_right] = tile_values['walk']
+            if room in corner_passages: #in the corner of the room furthest from the board's centre
+                passage_x : int = left if column==0 else right-1
+                passage_y : int = top if row==0 else bottom-1
+                board_values[passage_y,passage_x] = tile_values[corner_passages[room]]
+            if row==1 and column==1 and right-left>=5 and bottom-top>=5: #the centre of the board, ringed by the middle room
+                centre_x : int = (left+right)//2
+                centre_y : int = (top+bottom)//2
+                board_values[centre_y-1:centre_y+1,centre_x-1:centre_x+1] = tile_values['centre']
+    #the players start on the border where the corridors meet it
+    start_positions : list[tuple[int,int]] = [(column_corridors[0],0),(column_corridors[1],0),(width-1,row_corridors[0]),
+                                              (width-1,row_corridors[1]),(column_corridors[1],height-1),(0,row_corridors[1])]
+    for player,(x,y) in zip(players,start_positions):
+        board_values[y,x] = tile_values[start_tiles[player]]
+    return board_values
+
+def main():
+    parser : argparse.ArgumentParser = argparse.ArgumentParser(description='generate a cluedo board of any size')
+    parser.add_argument('path',help='csv file to write the board to')
+    parser.add_argument('--width',type=int,default=100)
+    parser.add_argument('--height',type=int,default=100)
+    parser.add_argument('--seed',type=int,default=0)
+    arguments = parser.parse_args()
+    write_board_csv(generate_board(arguments.width,arguments.height,arguments.seed),arguments.path)
+    print('wrote a ',arguments.width,' by ',arguments.height,' board to ',arguments.path)
+
+if __name__ == '__main__':
+    main()
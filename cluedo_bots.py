@@ -0,0 +1,165 @@
+#this file stores programs which automatically play cluedo through the GameEngine
+#every bot provides the same methods, so the engine can ask any of them to take a turn
+
+import random
+import numpy as np
+from cluedo_engine import GameEngine,SuggestionResult,room_cards,weapon_cards,player_rep_cards
+from cluedo_deduction import Knowledge,cards_to_mask
+from cluedo_endgame import EndgameSolver,EndgameDecision
+
+#constants
+endgame_candidates : int = 8 #the endgame bot starts searching once this few (suspect,weapon,room) accusations are left
+endgame_time_budget : float = 0.05 #seconds the endgame bot searches for each turn
+
+#the methods every bot must provide, the default choices do nothing
+class Bot():
+    #called once before the game starts
+    def new_game(self,engine : GameEngine,seat : int):
+        pass
+
+    #pick a tile (x,y) or room name to move to, None to stay still
+    def choose_move(self,engine : GameEngine,seat : int,reachable_tiles : list[tuple[int,int]],reachable_rooms : list[str]):
+        return None
+
+    #pick the (suspect,weapon) to suggest in the current room, None to not suggest
+    def choose_suggestion(self,engine : GameEngine,seat : int,room : str):
+        return None
+
+    #pick which of the matching cards to show the suggester
+    def choose_card_to_show(self,engine : GameEngine,seat : int,suggester : int,matching_cards : list[str]):
+        return matching_cards[0]
+
+    #see the outcome of a suggestion made by any player
+    def observe_suggestion(self,engine : GameEngine,seat : int,result : SuggestionResult):
+        pass
+
+    #pick the (suspect,weapon,room) to accuse, None to not accuse
+    def choose_accusation(self,engine : GameEngine,seat : int):
+        return None
+
+
+#wanders between rooms at random, crossing off cards as they are shown
+#accuses once only one card of each type is left
+class SimpleBot(Bot):
+    def new_game(self,engine : GameEngine,seat : int):
+        self.rng : random.Random = random.Random(engine.seed*engine.num_seats+seat) #repeatable for a given game seed
+        cards = engine.card_controller
+        self.suspects : list[str] = player_rep_cards
+        self.weapons : list[str] = weapon_cards
+        self.rooms : list[str] = room_cards
+        self.seen : set[str] = set(cards.player_cards[seat]) #cards known not to be the murder cards
+        self.solved : set[str] = set() #cards known to be the murder cards
+
+    #the cards of a type which could still be the murder card
+    def candidates(self,cards : list[str]):
+        solved : list[str] = [card for card in cards if card in self.solved]
+        if len(solved)>0:
+            return solved
+        return [card for card in cards if card not in self.seen]
+
+    def choose_move(self,engine : GameEngine,seat : int,reachable_tiles : list[tuple[int,int]],reachable_rooms : list[str]):
+        if len(reachable_rooms)>0:
+            unseen_rooms : list[str] = [room for room in reachable_rooms if room in self.candidates(self.rooms)]
+            if len(unseen_rooms)>0:
+                return self.rng.choice(unseen_rooms)
+            return self.rng.choice(reachable_rooms)
+        #head for the closest room which could still be the murder room
+        return self.closest_tile(engine,reachable_tiles,self.candidates(self.rooms))
+
+    #the reachable tile closest to any of the rooms, None if no tile is reachable
+    def closest_tile(self,engine : GameEngine,reachable_tiles : list[tuple[int,int]],rooms : list[str]):
+        if len(reachable_tiles)==0:
+            return None
+        movement = engine.movement
+        room_nodes : list[int] = [movement.room_node(room) for room in rooms]
+        best_tile : tuple[int,int] = reachable_tiles[0]
+        best_distance : int = -1
+        for tile in reachable_tiles:
+            tile_node : int = movement.node_at(tile[0],tile[1])
+            distance : int = min(movement.distance(tile_node,room_node) for room_node in room_nodes)
+            if best_distance==-1 or distance<best_distance:
+                best_tile = tile
+                best_distance = distance
+        return best_tile
+
+    def choose_suggestion(self,engine : GameEngine,seat : int,room : str):
+        return self.rng.choice(self.candidates(self.suspects)),self.rng.choice(self.candidates(self.weapons))
+
+    def observe_suggestion(self,engine : GameEngine,seat : int,result : SuggestionResult):
+        if result.suggester!=seat:
+            return
+        if result.refuter==-1:
+            #nobody could refute, so any card we do not hold is a murder card
+            for card in (result.suspect,result.weapon,result.room):
+                if card not in engine.card_controller.player_cards[seat]:
+                    self.solved.add(card)
+        else:
+            self.seen.add(result.shown_card)
+
+    def choose_accusation(self,engine : GameEngine,seat : int):
+        suspects : list[str] = self.candidates(self.suspects)
+        weapons : list[str] = self.candidates(self.weapons)
+        rooms : list[str] = self.candidates(self.rooms)
+        if len(suspects)==1 and len(weapons)==1 and len(rooms)==1:
+            return suspects[0],weapons[0],rooms[0]
+        return None
+
+
+#moves like SimpleBot, but keeps full knowledge of who holds each card from every suggestion it sees
+#so it learns from suggestions made by other players too
+class DeductionBot(SimpleBot):
+    def new_game(self,engine : GameEngine,seat : int):
+        SimpleBot.new_game(self,engine,seat)
+        self.knowledge : Knowledge = Knowledge.for_seat(engine.card_controller,seat)
+
+    def candidates(self,cards : list[str]):
+        return self.knowledge.candidates(cards_to_mask(cards))
+
+    def observe_suggestion(self,engine : GameEngine,seat : int,result : SuggestionResult):
+        shown_card : str|None = result.shown_card if result.suggester==seat else None #only the suggester sees the card
+        self.knowledge.observe_suggestion(result.suggester,[result.suspect,result.weapon,result.room],result.refuter,shown_card)
+
+    def choose_accusation(self,engine : GameEngine,seat : int):
+        return self.knowledge.solution()
+
+
+#plays like DeductionBot until only a few accusations are left, then searches the rest of the game with an EndgameSolver
+#the search decides whether to accuse the most likely cards now, or which room to head for and what to suggest there
+class EndgameBot(DeductionBot):
+    def new_game(self,engine : GameEngine,seat : int):
+        DeductionBot.new_game(self,engine,seat)
+        self.solver : EndgameSolver = EndgameSolver(engine.movement,rng=np.random.default_rng(engine.seed*engine.num_seats+seat))
+        self.plan : tuple[str,str,str]|None = None #(room,suspect,weapon) the last search chose
+        self.last_decision : EndgameDecision|None = None
+
+    def choose_move(self,engine : GameEngine,seat : int,reachable_tiles : list[tuple[int,int]],reachable_rooms : list[str]):
+        if self.plan is None:
+            return DeductionBot.choose_move(self,engine,seat,reachable_tiles,reachable_rooms)
+        room : str = self.plan[0]
+        if engine.room_of_player(seat)==room:
+            return None
+        if room in reachable_rooms:
+            return room
+        return self.closest_tile(engine,reachable_tiles,[room])
+
+    def choose_suggestion(self,engine : GameEngine,seat : int,room : str):
+        if self.plan is not None and self.plan[0]==room:
+            return self.plan[1],self.plan[2]
+        return DeductionBot.choose_suggestion(self,engine,seat,room)
+
+    def choose_accusation(self,engine : GameEngine,seat : int):
+        self.plan = None
+        solution : tuple[str,str,str]|None = self.knowledge.solution()
+        if solution is not None:
+            return solution
+        if len(self.candidates(self.suspects))*len(self.candidates(self.weapons))*len(self.candidates(self.rooms))>endgame_candidates:
+            return None
+        self.last_decision = self.solver.decide(engine,seat,self.knowledge,endgame_time_budget)
+        if self.last_decision.accuse==True:
+            return self.last_decision.accusation
+        self.plan = self.last_decision.plan
+        return None
+
+
+#the bots which can be picked by name, for example in tournaments
+bot_types : dict[str,type] = {'simple' : SimpleBot,'deduction' : DeductionBot,'endgame' : EndgameBot}
@@ -0,0 +1,215 @@
+#this file works out what can be deduced about who holds each card
+#cards are bits in an integer, using their index in all_cards, so sets of cards are combined with & and |
+#knowledge is updated as each suggestion is resolved, and only the owners affected are rechecked
+
+from cluedo_engine import CardController,room_cards,weapon_cards,player_rep_cards,all_cards
+
+#constants
+num_cards : int = len(all_cards)
+card_bits : dict[str,int] = {card : 1<<i for i,card in enumerate(all_cards)} #bit of each card
+all_cards_mask : int = (1<<num_cards)-1
+room_mask : int = sum(card_bits[card] for card in room_cards)
+weapon_mask : int = sum(card_bits[card] for card in weapon_cards)
+suspect_mask : int = sum(card_bits[card] for card in player_rep_cards)
+category_masks : list[int] = [room_mask,weapon_mask,suspect_mask] #the murder envelope holds one card of each
+
+#the bitmask of a list of cards
+def cards_to_mask(cards : list[str]):
+    mask : int = 0
+    for card in cards:
+        mask = mask | card_bits[card]
+    return mask
+
+#the cards in a bitmask, in the order of all_cards
+def mask_to_cards(mask : int):
+    return [card for i,card in enumerate(all_cards) if mask>>i & 1]
+
+
+#what is known about who holds each card
+#owners are the seats, followed by the murder envelope
+#for each owner we track the cards they have, the cards they do not have, and sets of cards they have at least one of
+#a ValueError is raised if the observations contradict each other
+class Knowledge():
+    def __init__(self,hand_sizes : list[int]):
+        self.num_seats : int = len(hand_sizes)
+        self.envelope : int = self.num_seats #owner number of the murder envelope
+        self.num_owners : int = self.num_seats+1
+        self.hand_sizes : list[int] = list(hand_sizes)+[len(category_masks)] #number of cards each owner holds
+        self.has : list[int] = [0]*self.num_owners #cards each owner is known to have
+        self.lacks : list[int] = [0]*self.num_owners #cards each owner is known not to have
+        self.one_of : list[list[int]] = [[] for owner in range(self.num_owners)] #sets of cards each owner has at least one of
+        self.pending_owners : set[int] = set() #owners whose facts have changed since they were last checked
+        self.pending_cards : int = 0 #cards which have become lacked by another owner since they were last checked
+        self.updates : int = 0 #number of new facts learned
+        for seat,hand_size in enumerate(hand_sizes):
+            if hand_size==0: #seats which are not playing hold nothing
+                self.add_lacks(seat,all_cards_mask)
+        self.propagate()
+
+    #knowledge for the player in one seat at the start of a game, knowing their own hand
+    @staticmethod
+    def for_seat(card_controller : CardController,seat : int):
+        knowledge : Knowledge = Knowledge([len(cards) for cards in card_controller.player_cards])
+        knowledge.add_has(seat,card_controller.hand_masks[seat]) #hand masks use the same card bits
+        knowledge.propagate()
+        return knowledge
+
+    #an independent copy, for searching ahead
+    def copy(self):
+        copied : Knowledge = Knowledge.__new__(Knowledge)
+        copied.num_seats = self.num_seats
+        copied.envelope = self.envelope
+        copied.num_owners = self.num_owners
+        copied.hand_sizes = self.hand_sizes
+        copied.has = list(self.has)
+        copied.lacks = list(self.lacks)
+        copied.one_of = [list(sets) for sets in self.one_of]
+        copied.pending_owners = set(self.pending_owners)
+        copied.pending_cards = self.pending_cards
+        copied.updates = self.updates
+        return copied
+
+    #record that an owner has all of a set of cards, which means nobody else has them
+    def add_has(self,owner : int,mask : int):
+        new : int = mask & ~self.has[owner]
+        if new==0:
+            return
+        if new & self.lacks[owner]:
+            raise ValueError('owner '+str(owner)+' cannot have '+str(mask_to_cards(new & self.lacks[owner])))
+        self.has[owner] = self.has[owner] | new
+        self.updates = self.updates + 1
+        self.pending_owners.add(owner)
+        for other in range(self.num_owners):
+            if other!=owner:
+                self.add_lacks(other,new)
+
+    #record that an owner has none of a set of cards
+    def add_lacks(self,owner : int,mask : int):
+        new : int = mask & ~self.lacks[owner]
+        if new==0:
+            return
+        if new & self.has[owner]:
+            raise ValueError('owner '+str(owner)+' must have '+str(mask_to_cards(new & self.has[owner])))
+        self.lacks[owner] = self.lacks[owner] | new
+        self.updates = self.updates + 1
+        self.pending_owners.add(owner)
+        self.pending_cards = self.pending_cards | new
+
+    #record that an owner has at least one of a set of cards
+    def add_one_of(self,owner : int,mask : int):
+        if mask & self.has[owner]: #already satisfied
+            return
+        self.one_of[owner].append(mask)
+        self.pending_owners.add(owner)
+
+    #apply the rules until nothing new can be deduced
+    def propagate(self):
+        while len(self.pending_owners)>0 or self.pending_cards!=0:
+            if self.pending_cards!=0:
+                cards : int = self.pending_cards
+                self.pending_cards = 0
+                self.check_cards(cards)
+            else:
+                self.check_owner(self.pending_owners.pop())
+
+    #a card every owner but one lacks must be held by that owner
+    def check_cards(self,cards : int):
+        while cards:
+            bit : int = cards & -cards
+            cards = cards ^ bit
+            possible_owner : int = -1
+            for owner in range(self.num_owners):
+                if self.lacks[owner] & bit==0:
+                    if possible_owner!=-1: #more than one owner could have it
+                        possible_owner = -2
+                        break
+                    possible_owner = owner
+            if possible_owner==-1:
+                raise ValueError('nobody can hold '+mask_to_cards(bit)[0])
+            if possible_owner>=0:
+                self.add_has(possible_owner,bit)
+
+    #apply the rules which only involve one owner
+    def check_owner(self,owner : int):
+        has : int = self.has[owner]
+        lacks : int = self.lacks[owner]
+        #sets of cards the owner has one of, a set with one possible card left means they have it
+        remaining_sets : list[int] = []
+        for mask in self.one_of[owner]:
+            if mask & has:
+                continue
+            possible : int = mask & ~lacks
+            if possible==0:
+                raise ValueError('owner '+str(owner)+' has none of '+str(mask_to_cards(mask)))
+            if possible & (possible-1)==0:
+                self.add_has(owner,possible)
+            else:
+                remaining_sets.append(possible)
+        self.one_of[owner] = remaining_sets
+        #once the number of cards held or possible matches the hand size the rest is known
+        hand_size : int = self.hand_sizes[owner]
+        has = self.has[owner]
+        possible_cards : int = all_cards_mask & ~self.lacks[owner]
+        if has.bit_count()==hand_size:
+            self.add_lacks(owner,all_cards_mask & ~has)
+        elif possible_cards.bit_count()==hand_size:
+            self.add_has(owner,possible_cards)
+        elif possible_cards.bit_count()<hand_size:
+            raise ValueError('owner '+str(owner)+' cannot make up a hand of '+str(hand_size))
+        #the envelope holds exactly one card of each type
+        if owner==self.envelope:
+            for category in category_masks:
+                held : int = self.has[owner] & category
+                if held:
+                    self.add_lacks(owner,category & ~held)
+                possible : int = category & ~self.lacks[owner]
+                if possible==0:
+                    raise ValueError('the envelope must hold a card of each type')
+                if possible & (possible-1)==0:
+                    self.add_has(owner,possible)
+
+    #the player in a seat holds these cards
+    def observe_hand(self,seat : int,cards : list[str]):
+        self.add_has(seat,cards_to_mask(cards))
+        self.propagate()
+
+    #a seat showed a card to us
+    def observe_card(self,seat : int,card : str):
+        self.add_has(seat,card_bits[card])
+        self.propagate()
+
+    #the outcome of a suggestion, refuter is -1 if nobody could refute it
+    #shown_card is the card shown if we were the suggester, None otherwise
+    def observe_suggestion(self,suggester : int,cards : list[str],refuter : int,shown_card : str|None = None):
+        mask : int = cards_to_mask(cards)
+        #everyone asked before the refuter had none of the cards
+        for offset in range(1,self.num_seats):
+            seat : int = (suggester+offset)%self.num_seats
+            if seat==refuter:
+                break
+            self.add_lacks(seat,mask)
+        if refuter!=-1:
+            if shown_card is not None:
+                self.add_has(refuter,card_bits[shown_card])
+            else:
+                self.add_one_of(refuter,mask)
+        self.propagate()
+
+    #the cards of one type which could still be in the envelope
+    def candidates(self,category_mask : int):
+        return mask_to_cards(category_mask & ~self.lacks[self.envelope])
+
+    #the owner known to hold a card, -1 if it is not known
+    def owner_of(self,card : str):
+        bit : int = card_bits[card]
+        for owner in range(self.num_owners):
+            if self.has[owner] & bit:
+                return owner
+        return -1
+
+    #the murder cards as (suspect,weapon,room) if they are known, None otherwise
+    def solution(self):
+        envelope_cards : int = self.has[self.envelope]
+        if envelope_cards.bit_count()<len(category_masks):
+            return None
+        return mask_to_cards(envelope_cards & suspect_mask)[0],mask_to_cards(envelope_cards & weapon_mask)[0],mask_to_cards(envelope_cards & room_mask)[0]
@@ -0,0 +1,283 @@
+#this file searches ahead at the end of a game, to decide whether a seat should accuse now or keep making suggestions
+#what the seat believes is a set of sampled deals consistent with its knowledge, held as the bits of an integer
+#a suggestion's outcome keeps the deals which would have given it, so the same belief is reached by making suggestions in any order
+#so the value of each belief and position is kept in a bounded transposition table, and found again rather than searched again
+#decide with: EndgameSolver(engine.movement).decide(engine,seat,knowledge,time_budget)
+
+import collections
+import time
+import numpy as np
+from cluedo_engine import GameEngine,resolve_suggestions,all_cards,room_cards,weapon_cards,player_rep_cards,card_number
+from cluedo_deduction import Knowledge
+from cluedo_board_data import room_tiles
+from cluedo_movement import MovementGraph
+from cluedo_probability import DealSampler,OutOfTime
+
+#constants
+roll_chances : dict[int,float] = {roll : (6-abs(roll-7))/36 for roll in range(2,13)} #chance of each total of two dice
+deadline_check_interval : int = 8 #searched nodes between checks of the time budget
+max_depth : int = 12 #most turns searched ahead
+
+#the bitmask of the deals for which a condition is true
+def deals_mask(condition : np.ndarray):
+    return int.from_bytes(np.packbits(condition,bitorder='little').tobytes(),'little')
+
+
+#search results keyed by belief and position, dropping the least recently used once full
+#each entry is (turns searched,value,plan), and is used for searches of as many turns or fewer
+class TranspositionTable():
+    def __init__(self,capacity : int = 100000):
+        self.capacity : int = capacity
+        self.entries : collections.OrderedDict[tuple[int,int],tuple[int,float,tuple[str,str,str]|None]] = collections.OrderedDict()
+        self.lookups : int = 0
+        self.hits : int = 0
+        self.evictions : int = 0
+
+    #the entry for a key searched at least depth turns, None if there is none
+    def lookup(self,key : tuple[int,int],depth : int):
+        self.lookups = self.lookups + 1
+        entry : tuple[int,float,tuple[str,str,str]|None]|None = self.entries.get(key)
+        if entry is None or entry[0]<depth:
+            return None
+        self.hits = self.hits + 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def store(self,key : tuple[int,int],depth : int,value : float,plan : tuple[str,str,str]|None):
+        self.entries[key] = (depth,value,plan)
+        self.entries.move_to_end(key)
+        if len(self.entries)>self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions = self.evictions + 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+#what a search decided, and how much work it took
+class EndgameDecision():
+    def __init__(self,accuse : bool,accusation : tuple[str,str,str]|None,plan : tuple[str,str,str]|None,accuse_value : float,value : float):
+        self.accuse : bool = accuse #accuse now, rather than keep making suggestions
+        self.accusation : tuple[str,str,str]|None = accusation #the most likely (suspect,weapon,room)
+        self.plan : tuple[str,str,str]|None = plan #(room,suspect,weapon) to head for and suggest next turn, None when accusing
+        self.accuse_value : float = accuse_value #chance the accusation is right
+        self.value : float = value #chance of winning, playing as the search assumes
+        self.depth : int = 0 #turns searched ahead by the last complete search
+        self.nodes : int = 0 #positions searched
+        self.lookups : int = 0 #transposition table lookups and hits during the search
+        self.hits : int = 0
+        self.deals : int = 0 #sampled deals the belief was made from
+
+    #share of transposition table lookups which found an entry
+    def hit_rate(self):
+        if self.lookups==0:
+            return 0.0
+        return self.hits/self.lookups
+
+
+#searches the rest of a game for one seat, expecting the other players to win with a fixed chance on each of their turns
+#each turn the seat heads for a room, suggests there if the dice let it in, then accuses or carries on
+#refuters are expected to show the first of the suggested cards they hold, as the engine does for bots which do not choose
+#the sampled deals are kept between decisions while enough still agree with the knowledge, so the table stays useful from turn to turn
+class EndgameSolver():
+    def __init__(self,movement : MovementGraph,table_size : int = 100000,num_deals : int = 512,opponent_win_chance : float = 0.1,rng : np.random.Generator|None = None):
+        if rng is None:
+            rng = np.random.default_rng()
+        self.movement : MovementGraph = movement
+        self.table : TranspositionTable = TranspositionTable(table_size)
+        self.num_deals : int = num_deals
+        self.opponent_win_chance : float = opponent_win_chance
+        self.rng : np.random.Generator = rng
+        self.seat : int = -1
+        self.owners : np.ndarray|None = None #(deals,cards) owner of each card in the sampled deals
+        self.survival : float = 1.0 #chance nobody else wins before the seat's next turn
+        self.card_deals : list[int] = [] #deals with each card in the envelope
+        self.triple_deals : list[tuple[tuple[str,str,str],int]] = [] #each (suspect,weapon,room) in the sampled envelopes, and its deals
+        self.accuse_values : dict[int,tuple[float,tuple[str,str,str]|None]] = {} #best accusation for each belief
+        self.suggestion_deals : dict[tuple[str,str,str],list[int]] = {} #deals giving each outcome of each suggestion
+        self.move_outcomes_cache : dict[tuple[int,str],tuple[float,list[tuple[float,int]]]] = {} #movement only depends on the board, so this is never cleared
+        self.nodes : int = 0
+        self.deadline : float|None = None
+
+    #decide whether a seat should accuse now, at the end of its turn, searching deeper until the time budget runs out
+    #a search one turn deep is always finished, so the time budget can be overrun on a belief with many candidates
+    def decide(self,engine : GameEngine,seat : int,knowledge : Knowledge,time_budget : float = 0.05):
+        start : float = time.perf_counter()
+        self.deadline = None
+        opponents : int = sum(1 for other in range(engine.num_seats) if other!=seat and engine.card_controller.player_playing[other]==True and engine.eliminated[other]==False)
+        belief : int = self.update_deals(knowledge,seat,(1-self.opponent_win_chance)**opponents,start+time_budget/2)
+        if belief==0: #no deal agrees with the knowledge, so there is nothing to search
+            return EndgameDecision(False,None,None,0.0,0.0)
+        x,y = engine.player_positions.position(seat)
+        node : int = self.movement.node_at(x,y)
+        accuse_value,accusation = self.accuse_value(belief)
+        decision : EndgameDecision = EndgameDecision(True,accusation,None,accuse_value,accuse_value)
+        decision.deals = belief.bit_count()
+        lookups,hits = self.table.lookups,self.table.hits
+        self.nodes = 0
+        for depth in range(1,max_depth+1):
+            try:
+                value,plan = self.turn_value(belief,node,depth)
+            except OutOfTime:
+                break
+            decision.depth = depth
+            continue_value : float = self.survival*value
+            decision.accuse = accuse_value>=continue_value
+            decision.plan = None if decision.accuse==True else plan
+            decision.value = max(accuse_value,continue_value)
+            if accuse_value>=1.0:
+                break
+            self.deadline = start+time_budget #only the first search is let run past the budget
+        decision.nodes = self.nodes
+        decision.lookups = self.table.lookups-lookups
+        decision.hits = self.table.hits-hits
+        return decision
+
+    #bring the sampled deals up to date with the knowledge, returning the belief, the bits of the deals which agree with it
+    #new deals are only sampled when fewer than half of the old ones still agree, and the table is then emptied as its keys no longer apply
+    def update_deals(self,knowledge : Knowledge,seat : int,survival : float,deadline : float):
+        sampler : DealSampler = DealSampler(knowledge,self.rng,self.num_deals)
+        if self.owners is not None and len(self.owners)>0 and seat==self.seat:
+            consistent : np.ndarray = sampler.consistent(self.owners)
+            if consistent.sum()*2>=len(self.owners):
+                if survival!=self.survival: #the values in the table assumed a different number of opponents
+                    self.table.clear()
+                    self.survival = survival
+                return deals_mask(consistent)
+        batches : list[np.ndarray] = []
+        found : int = 0
+        while found<self.num_deals:
+            owners,consistent = sampler.sample_batch()
+            batches.append(owners[consistent])
+            found = found+int(consistent.sum())
+            if time.perf_counter()>deadline:
+                break
+        self.seat = seat
+        self.survival = survival
+        self.owners = np.concatenate(batches)[:self.num_deals]
+        self.table.clear()
+        self.accuse_values = {}
+        self.suggestion_deals = {}
+        in_envelope : np.ndarray = self.owners==knowledge.envelope
+        self.card_deals = [deals_mask(in_envelope[:,card]) for card in range(len(all_cards))]
+        #the envelope cards of each deal, which sort into room, weapon then suspect
+        envelopes : np.ndarray = np.nonzero(in_envelope)[1].reshape(-1,3)
+        self.triple_deals = [((all_cards[suspect],all_cards[weapon],all_cards[room]),deals_mask((envelopes==(room,weapon,suspect)).all(axis=1)))
+                             for room,weapon,suspect in np.unique(envelopes,axis=0).tolist()]
+        return (1<<len(self.owners))-1
+
+    #the chance the most likely accusation is right given a belief, and the accusation
+    def accuse_value(self,belief : int):
+        if belief in self.accuse_values:
+            return self.accuse_values[belief]
+        best_count : int = 0
+        best_triple : tuple[str,str,str]|None = None
+        for triple,deals in self.triple_deals:
+            count : int = (belief & deals).bit_count()
+            if count>best_count:
+                best_count = count
+                best_triple = triple
+        answer : tuple[float,tuple[str,str,str]|None] = (best_count/belief.bit_count(),best_triple)
+        self.accuse_values[belief] = answer
+        return answer
+
+    #the chance of winning from the start of a turn, searching depth turns ahead, and the best (room,suspect,weapon) to try
+    #the plan is None if accusing straight away is best
+    def turn_value(self,belief : int,node : int,depth : int):
+        accuse_value,accusation = self.accuse_value(belief)
+        if accuse_value>=1.0:
+            return accuse_value,None
+        key : tuple[int,int] = (belief,node)
+        entry : tuple[int,float,tuple[str,str,str]|None]|None = self.table.lookup(key,depth)
+        if entry is not None:
+            return entry[1],entry[2]
+        self.nodes = self.nodes + 1
+        if self.deadline is not None and self.nodes%deadline_check_interval==0 and time.perf_counter()>self.deadline:
+            raise OutOfTime()
+        best_value : float = accuse_value
+        best_plan : tuple[str,str,str]|None = None
+        suspects : list[str] = self.candidates(belief,player_rep_cards)
+        weapons : list[str] = self.candidates(belief,weapon_cards)
+        rooms : list[str] = self.candidates(belief,room_cards)
+        if node>=self.movement.num_tile_nodes: #the room the seat is in can always be suggested in again
+            current_room : str = room_tiles[node-self.movement.num_tile_nodes]
+            if current_room not in rooms:
+                rooms = rooms+[current_room]
+        total : int = belief.bit_count()
+        for room in rooms:
+            reach_chance,missed = self.move_outcomes(node,room)
+            #the dice fall short of the room, the seat is nearer but learns nothing
+            missed_value : float = sum(chance*self.end_of_turn_value(belief,missed_node,depth) for chance,missed_node in missed)
+            if reach_chance==0.0: #out of reach this turn, so only worth heading towards
+                if missed_value>best_value:
+                    best_value = missed_value
+                    best_plan = (room,suspects[0],weapons[0])
+                continue
+            room_node : int = self.movement.room_node(room)
+            for suspect in suspects:
+                for weapon in weapons:
+                    suggested_value : float = 0.0
+                    for deals in self.suggestion_outcomes(suspect,weapon,room):
+                        outcome : int = belief & deals
+                        if outcome!=0:
+                            suggested_value = suggested_value+outcome.bit_count()/total*self.end_of_turn_value(outcome,room_node,depth)
+                    value : float = reach_chance*suggested_value+missed_value
+                    if value>best_value:
+                        best_value = value
+                        best_plan = (room,suspect,weapon)
+        self.table.store(key,depth,best_value,best_plan)
+        return best_value,best_plan
+
+    #the chance of winning at the end of a turn, accusing if that is better than letting the others play
+    def end_of_turn_value(self,belief : int,node : int,depth : int):
+        accuse_value : float = self.accuse_value(belief)[0]
+        if depth<=1 or accuse_value>=1.0:
+            return accuse_value
+        return max(accuse_value,self.survival*self.turn_value(belief,node,depth-1)[0])
+
+    #the cards of a type still in some sampled envelope of a belief
+    def candidates(self,belief : int,cards : list[str]):
+        return [card for card in cards if belief & self.card_deals[card_number[card]]]
+
+    #the deals giving each distinct outcome of the seat suggesting three cards, as bits
+    def suggestion_outcomes(self,suspect : str,weapon : str,room : str):
+        key : tuple[str,str,str] = (suspect,weapon,room)
+        if key not in self.suggestion_deals:
+            num_deals : int = len(self.owners)
+            cards : np.ndarray = np.tile(np.array([card_number[suspect],card_number[weapon],card_number[room]]),(num_deals,1))
+            refuters,matching = resolve_suggestions(self.owners,np.arange(num_deals),np.full(num_deals,self.seat),cards)
+            shown : np.ndarray = np.where(refuters>=0,cards[np.arange(num_deals),matching.argmax(axis=1)],-1)
+            outcomes : np.ndarray = refuters*len(all_cards)+shown #one number for each refuter and shown card
+            self.suggestion_deals[key] = [deals_mask(outcomes==outcome) for outcome in np.unique(outcomes).tolist()]
+        return self.suggestion_deals[key]
+
+    #the chance of a turn from a node getting into a room, and where the seat ends up otherwise, as (chance,node)
+    #short of the room, the seat stops on the tile nearest to it
+    def move_outcomes(self,node : int,room : str):
+        key : tuple[int,str] = (node,room)
+        if key in self.move_outcomes_cache:
+            return self.move_outcomes_cache[key]
+        movement : MovementGraph = self.movement
+        room_node : int = movement.room_node(room)
+        reach_chance : float = 0.0
+        missed : dict[int,float] = {}
+        for roll,chance in roll_chances.items():
+            if node==room_node: #staying put
+                reach_chance = reach_chance+chance
+                continue
+            reachable_tiles,reachable_rooms = movement.reachable(node,roll)
+            if room in reachable_rooms:
+                reach_chance = reach_chance+chance
+                continue
+            end_node : int = node
+            if len(reachable_tiles)>0:
+                tiles : np.ndarray = np.array(reachable_tiles)
+                tile_nodes : np.ndarray = movement.node_index[tiles[:,1],tiles[:,0]]
+                end_node = int(tile_nodes[movement.room_distances[room_node-movement.num_tile_nodes,tile_nodes].argmin()]) #the first of the closest tiles
+            missed[end_node] = missed.get(end_node,0.0)+chance
+        answer : tuple[float,list[tuple[float,int]]] = (reach_chance,[(chance,missed_node) for missed_node,chance in missed.items()])
+        self.move_outcomes_cache[key] = answer
+        return answer
@@ -0,0 +1,416 @@
+#this file stores the logic for playing the game of cluedo without any rendering
+#the board, player positions, cards, turns, suggestions and accusations all live here
+#cluedo.py displays this state with pygame, bots drive it directly for self-play
+
+import random
+import typing
+import numpy as np #for storing the state of the board
+from cluedo_board_data import room_tiles,start_tiles,BoardIndex,TileGeometry,get_board_index
+from cluedo_movement import MovementGraph,get_movement_graph
+from cluedo_profiler import profiler,TimedObject #timings of each turn, only taken while enabled
+
+#constants
+#the cards of each type, a card's position in all_cards is its index
+room_cards : list[str] = ["billards","kitchen","lounge","library","hall","study","ballroom","dining_room","conservatory"]
+weapon_cards : list[str] = ["spanner","rope","dagger","lead_piping","candlestick"]
+player_rep_cards : list[str] = ["mustard","scarlet","peacock","rev_green","plum","white"]
+all_cards : list[str] = room_cards + weapon_cards + player_rep_cards
+seat_of_player : dict[str,int] = {player : seat for seat,player in enumerate(player_rep_cards)} #players sit in the order of player_rep_cards
+card_number : dict[str,int] = {card : i for i,card in enumerate(all_cards)} #index of each card in all_cards
+
+#controls the state of cards in the game
+class CardController():
+    #create the list of cards and decide on the murder cards
+    #rng is the random number generator for this game, so games can be reproduced from a seed
+    def __init__(self,rng : random.Random|None = None):
+        if rng is None:
+            rng = random.Random()
+        self.rng : random.Random = rng
+        self.room_cards : list[str] = list(room_cards)
+        self.weapon_cards : list[str] = list(weapon_cards)
+        self.player_rep_cards : list[str] = list(player_rep_cards)
+        self.calculate_murder_cards()
+        self.players : list[str] = list(player_rep_cards) #list of all valid players
+        self.num_players : int = len(self.players)
+
+
+    def calculate_murder_cards(self):
+        #how many cards of each type
+        num_room_cards : int = len(self.room_cards)
+        num_weapon_cards : int = len(self.weapon_cards)
+        num_player_cards : int = len(self.player_rep_cards)
+        #get the murder card index for each room
+        room_card_num : int = self.rng.randint(0,num_room_cards-1)
+        weapon_card_num : int = self.rng.randint(0,num_weapon_cards-1)
+        player_card_num : int = self.rng.randint(0,num_player_cards-1)
+        #extract each murder card and remove it from the list of free cards
+        self.murder_room : str = self.room_cards[room_card_num]
+        del self.room_cards[room_card_num]
+        self.murder_weapon : str = self.weapon_cards[weapon_card_num]
+        del self.weapon_cards[weapon_card_num]
+        self.murder_player : str = self.player_rep_cards[player_card_num]
+        del self.player_rep_cards[player_card_num]
+        self.all_cards_left : list[str] = self.room_cards + self.weapon_cards + self.player_rep_cards
+
+    def assign_cards_to_players(self,player_list : list[str]):
+        #note player list is in order
+        #is each player playing, and the seats dealt to in order
+        self.player_playing : list[bool] = find_playing_seats(player_list)
+        self.dealing_order : list[int] = [seat for seat in range(self.num_players) if self.player_playing[seat]==True]
+        #lists to store which cards players own
+        self.player_cards : list[list[str]] = [[] for seat in range(self.num_players)]
+        #shuffle the pile once then deal it round the table
+        self.rng.shuffle(self.all_cards_left)
+        num_dealing : int = len(self.dealing_order)
+        for i,card in enumerate(self.all_cards_left):
+            self.player_cards[self.dealing_order[i%num_dealing]].append(card)
+        self.all_cards_left = [] #every card has been dealt
+        #who holds each card, by card index, and the cards in each hand as bits of card indices
+        self.card_owner : list[int] = [self.num_players]*len(all_cards) #the murder cards are owned by num_players
+        self.hand_masks : list[int] = [0]*self.num_players
+        for seat,hand in enumerate(self.player_cards):
+            for card in hand:
+                self.card_owner[card_number[card]] = seat
+                self.hand_masks[seat] = self.hand_masks[seat] | 1<<card_number[card]
+
+    #the first seat after the suggester holding any of the suggested cards, and the cards it holds, -1 and [] if nobody does
+    #only the owners of the three cards are looked at, rather than going through every hand
+    def find_refuter(self,suggester : int,cards : tuple[str,str,str]):
+        refuter : int = -1
+        closest : int = self.num_players #seats after the suggester of the closest refuter found so far
+        for card in cards:
+            owner : int = self.card_owner[card_number[card]]
+            if owner==self.num_players or owner==suggester:
+                continue
+            seats_after : int = (owner-suggester)%self.num_players
+            if seats_after<closest:
+                closest = seats_after
+                refuter = owner
+        if refuter==-1:
+            return -1,[]
+        return refuter,[card for card in cards if self.card_owner[card_number[card]]==refuter]
+
+#is each seat playing, given the players in the game
+#invalid players are skipped with a warning, a ValueError is raised if nobody valid is left
+def find_playing_seats(player_list : list[str]):
+    player_playing : list[bool] = [False]*len(player_rep_cards)
+    for player in player_list:
+        if player in seat_of_player:
+            player_playing[seat_of_player[player]] = True
+        else:
+            print("WARNING: INVALID PLAYER ",player," DETECTED")
+    if True not in player_playing:
+        raise ValueError('at least one valid player is needed')
+    return player_playing
+
+#deal num_deals games at once, for experiments which need many deals
+#returns an int8 array of card indices of shape (num_deals,seats+1,cards per hand), the last row of each deal is the murder envelope
+#hands with fewer cards, and the envelope, are padded with -1
+def deal_many(num_deals : int,player_list : list[str],rng : np.random.Generator):
+    dealing_order : np.ndarray = np.flatnonzero(find_playing_seats(player_list))
+    num_seats : int = len(player_rep_cards)
+    num_dealt : int = len(all_cards)-3
+    hand_size : int = max(-(-num_dealt//len(dealing_order)),3)
+    #pick the murder cards
+    weapon_start : int = len(room_cards)
+    suspect_start : int = len(room_cards)+len(weapon_cards)
+    envelope : np.ndarray = np.stack([rng.integers(0,len(room_cards),num_deals),
+                                      weapon_start+rng.integers(0,len(weapon_cards),num_deals),
+                                      suspect_start+rng.integers(0,len(player_rep_cards),num_deals)],axis=1)
+    #shuffle the rest of the cards, the murder cards sort to the end and are never dealt
+    order_keys : np.ndarray = rng.random((num_deals,len(all_cards)))
+    np.put_along_axis(order_keys,envelope,2.0,axis=1)
+    deck : np.ndarray = np.argsort(order_keys,axis=1)[:,:num_dealt]
+    #the cards at every len(dealing_order)th position of the deck go to the same seat
+    deals : np.ndarray = np.full((num_deals,num_seats+1,hand_size),-1,dtype=np.int8)
+    for i,seat in enumerate(dealing_order):
+        hand : np.ndarray = deck[:,i::len(dealing_order)]
+        deals[:,seat,:hand.shape[1]] = hand
+    deals[:,num_seats,:3] = envelope
+    return deals
+
+#the owner of each card in deals from deal_many, an int8 array of shape (num_deals,cards), the murder cards are owned by the number of seats
+def owners_of_deals(deals : np.ndarray):
+    num_deals,num_owners,hand_size = deals.shape
+    card_owner : np.ndarray = np.zeros((num_deals,len(all_cards)),dtype=np.int8)
+    deal,owner,position = np.nonzero(deals>=0)
+    card_owner[deal,deals[deal,owner,position]] = owner
+    return card_owner
+
+#resolve many suggestions at once, over any number of games
+#card_owner is the (games,cards) owner array of the games, and each suggestion is made in games[i] by suggesters[i] with the three card indices cards[i]
+#returns the refuting seat of each suggestion, -1 if nobody could refute it, and which of its three cards the refuter holds
+def resolve_suggestions(card_owner : np.ndarray,games : np.ndarray,suggesters : np.ndarray,cards : np.ndarray):
+    num_seats : int = len(player_rep_cards)
+    owners : np.ndarray = card_owner[games[:,None],cards].astype(np.int32) #(suggestions,3)
+    seats_after : np.ndarray = (owners-suggesters[:,None])%num_seats
+    seats_after[(owners==num_seats) | (seats_after==0)] = num_seats #the envelope and the suggester cannot refute
+    closest : np.ndarray = seats_after.min(axis=1)
+    refuted : np.ndarray = closest<num_seats
+    refuters : np.ndarray = np.where(refuted,(suggesters+closest)%num_seats,-1)
+    matching : np.ndarray = (seats_after==closest[:,None]) & refuted[:,None]
+    return refuters,matching
+
+
+#the outcome of a single suggestion
+#shown_card is only known to the suggester and the refuter, bots should not read it otherwise
+class SuggestionResult():
+    def __init__(self,suggester : int,suspect : str,weapon : str,room : str,refuter : int,matching_cards : list[str],shown_card : str|None):
+        self.suggester : int = suggester #seat which made the suggestion
+        self.suspect : str = suspect
+        self.weapon : str = weapon
+        self.room : str = room
+        self.refuter : int = refuter #seat which refuted the suggestion, -1 if nobody could
+        self.matching_cards : list[str] = matching_cards #cards the refuter could have shown
+        self.shown_card : str|None = shown_card #card the refuter chose to show
+
+
+#where each player's token is, as a small array of positions plus a grid with a bit set for each seat on a tile
+#copying it only copies the arrays, so bots searching ahead can branch positions cheaply
+class PlayerPositions():
+    def __init__(self,players : list[str],board_height : int,board_width : int):
+        self.players : list[str] = players #the player in each seat
+        self.positions : np.ndarray = np.full((len(players),2),-1,dtype=np.int16) #x,y of each seat's token, -1,-1 if it is not on the board
+        self.occupancy : np.ndarray = np.zeros((board_height,board_width),dtype=np.uint8) #bit 1<<seat is set on the tile each seat is on
+
+    #move a seat's token to a tile
+    def move(self,seat : int,x : int,y : int):
+        old_x,old_y = self.positions[seat]
+        if old_x>=0:
+            self.occupancy[old_y,old_x] &= ~np.uint8(1<<seat)
+        self.positions[seat] = (x,y)
+        self.occupancy[y,x] |= np.uint8(1<<seat)
+
+    #the x,y position of a seat's token
+    def position(self,seat : int):
+        return int(self.positions[seat,0]),int(self.positions[seat,1])
+
+    #is any token on a tile
+    def is_occupied(self,x : int,y : int):
+        return self.occupancy[y,x]!=0
+
+    #the seats whose tokens are on a tile
+    def seats_at(self,x : int,y : int):
+        bits : int = int(self.occupancy[y,x])
+        return [seat for seat in range(len(self.players)) if bits>>seat & 1]
+
+    #each player on the board with their x,y position
+    def items(self):
+        return [(self.players[seat],(int(x),int(y))) for seat,(x,y) in enumerate(self.positions.tolist()) if x>=0]
+
+    #a copy of the positions array, which can be given to restore later
+    def snapshot(self):
+        return self.positions.copy()
+
+    #put every token back where it was when the snapshot was taken
+    def restore(self,snapshot : np.ndarray):
+        self.positions[:] = snapshot
+        self.occupancy[:] = 0
+        for seat,(x,y) in enumerate(snapshot.tolist()):
+            if x>=0:
+                self.occupancy[y,x] |= np.uint8(1<<seat)
+
+    #an independent copy of the positions
+    def copy(self):
+        copied : PlayerPositions = PlayerPositions.__new__(PlayerPositions)
+        copied.players = self.players
+        copied.positions = self.positions.copy()
+        copied.occupancy = self.occupancy.copy()
+        return copied
+
+
+#the state and rules of a single game of cluedo
+class GameEngine():
+    #movement is the board's precomputed movement graph, it is looked up from board_values if not given
+    #seed makes the deal and the dice repeatable, a random seed is picked if it is not given
+    def __init__(self,board_values : np.ndarray,active_players : list[str],debug : bool = False,movement : MovementGraph|None = None,seed : int|None = None):
+        self.name : str = 'engine' #name of the object, for debugging purposes
+        if seed is None:
+            seed = random.randrange(2**63)
+        self.seed : int = seed
+        self.rng : random.Random = random.Random(seed) #all randomness in the game comes from here
+        self.board_values : np.ndarray = board_values #numbers what type of static object each position holds
+        if movement is None:
+            movement = get_movement_graph(board_values)
+        self.movement : MovementGraph = movement #walking distances between places on the board
+        self.index : BoardIndex = get_board_index(board_values) #where each type of tile is on the board
+        self.board_height : int = board_values.shape[0] #height of the board in tiles
+        self.board_width : int = board_values.shape[1] #width of the board in tiles
+        self.debug : bool = debug
+        self.card_controller : CardController = CardController(self.rng) #decide on the murder cards
+        self.card_controller.assign_cards_to_players(active_players) #assign cards to players
+        self.seats : list[str] = self.card_controller.players #the player in each seat, in the order turns are taken
+        self.num_seats : int = len(self.seats)
+        self.eliminated : list[bool] = [False]*self.num_seats #has each player made a wrong accusation
+        self.find_rooms()
+        self.create_players_at_start()
+        self.history : list[SuggestionResult] = [] #every suggestion made so far
+        self.accusations : list[tuple[int,str,str,str,bool]] = [] #every accusation made so far, as (seat,suspect,weapon,room,correct)
+        self.last_roll : int = 0 #the dice roll of the latest turn
+        self.turn_number : int = 0
+        self.game_over : bool = False
+        self.winner : int = -1 #seat of the winning player, -1 if nobody has won
+        self.current_seat : int = -1
+        self.current_seat = self.next_active_seat(-1) #first player to take a turn
+
+    #find the tiles, doors and secret passages of each room from the board index
+    def find_rooms(self):
+        self.room_slots : dict[str,list[tuple[int,int]]] = {room : self.index[room].tiles for room in room_tiles} #tiles tokens can be placed on inside each room
+        self.room_doors : dict[str,list[tuple[int,int]]] = {room : self.index[room].doors for room in room_tiles} #walkable tiles directly outside each room
+        self.secret_passages : dict[str,str] = {room : self.index[room].secret_passage for room in room_tiles if self.index[room].secret_passage is not None} #room a secret passage leads to, from the room it sits in
+
+    #place each player's token on their start tile
+    def create_players_at_start(self):
+        self.player_positions : PlayerPositions = PlayerPositions(self.seats,self.board_height,self.board_width)
+        for seat,player in enumerate(self.seats):
+            start_geometry : TileGeometry = self.index[start_tiles[player]]
+            if start_geometry.count()>0:
+                x,y = start_geometry.tiles[0]
+                self.player_positions.move(seat,x,y)
+
+    #the room a tile belongs to, secret passages belong to the room surrounding them
+    def room_of_tile(self,x : int,y : int):
+        return self.index.room_at(x,y)
+
+    #the room a player is currently in, None if they are in the corridors
+    def room_of_player(self,seat : int):
+        x,y = self.player_positions.position(seat)
+        return self.room_of_tile(x,y)
+
+    #the seat of the first player after the given seat who can still take a turn, -1 if there are none
+    def next_active_seat(self,seat : int):
+        for offset in range(1,self.num_seats+1):
+            candidate : int = (seat+offset)%self.num_seats
+            if self.card_controller.player_playing[candidate]==True and self.eliminated[candidate]==False:
+                return candidate
+        return -1
+
+    #roll two dice
+    def roll_dice(self):
+        return self.rng.randint(1,6)+self.rng.randint(1,6)
+
+    #find the tiles and rooms a player can move to with a given roll
+    #players move up to the rolled number of steps, entering a room ends the move, secret passages can be taken instead
+    def reachable(self,seat : int,roll : int):
+        x,y = self.player_positions.position(seat)
+        reachable_tiles,reachable_rooms = self.movement.reachable(self.movement.node_at(x,y),roll)
+        #tiles which are free to stop on
+        occupancy : np.ndarray = self.player_positions.occupancy
+        return [tile for tile in reachable_tiles if occupancy[tile[1],tile[0]]==0],list(reachable_rooms)
+
+    #move a player's token onto a tile in the corridors
+    def move_to_tile(self,seat : int,x : int,y : int):
+        self.player_positions.move(seat,x,y)
+
+    #move a player's token into a room, placing it on a free tile of the room
+    def move_to_room(self,seat : int,room : str):
+        for x,y in self.room_slots[room]:
+            if self.player_positions.is_occupied(x,y)==False:
+                self.player_positions.move(seat,x,y)
+                return
+        x,y = self.room_slots[room][0] #room is full, share a tile
+        self.player_positions.move(seat,x,y)
+
+    #the first seat after the suggester holding any of the suggested cards, and the cards it holds, -1 and [] if nobody does
+    def find_refuter(self,seat : int,suspect : str,weapon : str,room : str):
+        return self.card_controller.find_refuter(seat,(suspect,weapon,room))
+
+    #make a suggestion from the room the player is in, returns the outcome
+    #bots is the list of bots for each seat, used to let the refuter pick which card to show
+    #shown_card, if given, is the card the refuter has already chosen to show, for refuters which are not bots
+    def make_suggestion(self,seat : int,suspect : str,weapon : str,bots : list|None = None,shown_card : str|None = None):
+        room : str|None = self.room_of_player(seat)
+        if room is None:
+            raise ValueError('suggestions can only be made from inside a room')
+        #the suggested player is brought into the room
+        suspect_seat : int = self.seats.index(suspect)
+        if self.room_of_player(suspect_seat)!=room:
+            self.move_to_room(suspect_seat,room)
+        #go around the table until someone can refute the suggestion
+        refuter,matching_cards = self.find_refuter(seat,suspect,weapon,room)
+        if refuter==-1:
+            shown_card = None
+        elif shown_card is None or shown_card not in matching_cards: #the refuter has not already chosen a card it can show
+            if bots is not None and bots[refuter] is not None:
+                shown_card = bots[refuter].choose_card_to_show(self,refuter,seat,matching_cards)
+            else:
+                shown_card = matching_cards[0]
+        result : SuggestionResult = SuggestionResult(seat,suspect,weapon,room,refuter,matching_cards,shown_card)
+        self.history.append(result)
+        if self.debug==True:
+            print(self.seats[seat],' suggests ',suspect,' ',weapon,' ',room,' refuted by ',self.seats[refuter] if refuter!=-1 else 'nobody')
+        #let every bot see the suggestion
+        if bots is not None:
+            for observer,bot in enumerate(bots):
+                if bot is not None:
+                    bot.observe_suggestion(self,observer,result)
+        return result
+
+    #make an accusation, the game is won if it is correct, otherwise the player is eliminated
+    def make_accusation(self,seat : int,suspect : str,weapon : str,room : str):
+        cards : CardController = self.card_controller
+        correct : bool = suspect==cards.murder_player and weapon==cards.murder_weapon and room==cards.murder_room
+        if correct==True:
+            self.game_over = True
+            self.winner = seat
+        else:
+            self.eliminated[seat] = True
+            remaining : list[int] = [i for i in range(self.num_seats) if cards.player_playing[i]==True and self.eliminated[i]==False]
+            if len(remaining)<=1: #the last player standing wins
+                self.game_over = True
+                self.winner = remaining[0] if len(remaining)==1 else -1
+        self.accusations.append((seat,suspect,weapon,room,correct))
+        if self.debug==True:
+            print(self.seats[seat],' accuses ',suspect,' ',weapon,' ',room,' correct = ',correct)
+        return correct
+
+    #pass the turn to the next player still in the game
+    def end_turn(self):
+        self.turn_number = self.turn_number + 1
+        if self.game_over==False:
+            self.current_seat = self.next_active_seat(self.current_seat)
+
+    #let the bot in the current seat take its turn
+    def play_turn(self,bots : list):
+        seat : int = self.current_seat
+        bot = bots[seat]
+        #move
+        roll : int = self.roll_dice()
+        self.last_roll = roll
+        reachable_tiles,reachable_rooms = self.reachable(seat,roll)
+        destination : tuple[int,int]|str|None = bot.choose_move(self,seat,reachable_tiles,reachable_rooms)
+        if isinstance(destination,str):
+            self.move_to_room(seat,destination)
+        elif destination is not None:
+            self.move_to_tile(seat,destination[0],destination[1])
+        #suggest
+        room : str|None = self.room_of_player(seat)
+        if room is not None:
+            suggestion : tuple[str,str]|None = bot.choose_suggestion(self,seat,room)
+            if suggestion is not None:
+                self.make_suggestion(seat,suggestion[0],suggestion[1],bots)
+        #accuse
+        accusation : tuple[str,str,str]|None = bot.choose_accusation(self,seat)
+        if accusation is not None:
+            self.make_accusation(seat,accusation[0],accusation[1],accusation[2])
+        self.end_turn()
+
+    #play until the game is won or the turn limit is reached, returns the winning seat or -1
+    #bots holds the bot controlling each seat, None for seats which are not playing
+    #after_turn, if given, is called with the engine and the seat which has just played after every turn
+    def play_game(self,bots : list,max_turns : int = 1000,after_turn : typing.Callable|None = None):
+        if profiler.enabled==True: #time each turn and every call to the bots
+            bots = [None if bot is None else TimedObject(bot,'bot') for bot in bots]
+        for seat,bot in enumerate(bots):
+            if bot is not None:
+                bot.new_game(self,seat)
+        while self.game_over==False and self.current_seat!=-1 and self.turn_number<max_turns:
+            seat : int = self.current_seat
+            if profiler.enabled==True:
+                with profiler.measure('turn'):
+                    self.play_turn(bots)
+            else:
+                self.play_turn(bots)
+            if after_turn is not None:
+                after_turn(self,seat)
+        return self.winner
@@ -0,0 +1,199 @@
+#this file precomputes how far players have to walk between places on the board
+#every walkable tile is a node, each room is a single node, and secret passage tiles share the node of the room they sit in
+#the distances are worked out once per board and cached on disk, where a roll can take a player is found by a short search
+#small boards keep the distance between every pair of nodes, larger ones only the distances to each room,
+#so the memory and load time of large boards grow with their size rather than its square
+
+import numpy as np
+from cluedo_board_data import tile_values,walk_tiles,room_tiles,secret_destinations,load_board,board_file_hash,cache_path,save_cache_file,BoardIndex,get_board_index
+
+#constants
+unreachable : int = 65535 #distance stored between nodes with no path, distances are kept as uint16
+cache_version : int = 3 #change when the format of the cached table changes
+max_table_nodes : int = 512 #boards with more nodes than this keep only the rows of the rooms, the table costs the square of the nodes to build
+
+#walking distances between the places on a board
+#a move may not pass through a room, so room nodes are only ever the start or the end of a path
+class MovementGraph():
+    def __init__(self,board_values : np.ndarray,distances : np.ndarray|None = None):
+        self.board_height : int = board_values.shape[0]
+        self.board_width : int = board_values.shape[1]
+        #number the nodes, walkable tiles first in reading order then the rooms in the order of room_tiles
+        walkable : np.ndarray = np.isin(board_values,[tile_values[tile_name] for tile_name in walk_tiles])
+        self.tile_positions : list[tuple[int,int]] = [(x,y) for y,x in np.argwhere(walkable).tolist()]
+        self.num_tile_nodes : int = len(self.tile_positions)
+        self.num_nodes : int = self.num_tile_nodes+len(room_tiles)
+        self.node_index : np.ndarray = np.full((self.board_height,self.board_width),-1,dtype=np.int32) #node of each tile, -1 for tiles which are not nodes
+        self.node_index[walkable] = np.arange(self.num_tile_nodes,dtype=np.int32)
+        for room_number,room in enumerate(room_tiles):
+            self.node_index[board_values==tile_values[room]] = self.num_tile_nodes+room_number
+        self.create_edges()
+        #secret passages belong to the room around them and lead to another room
+        index : BoardIndex = get_board_index(board_values)
+        self.secret_passages : dict[int,int] = {} #room node a passage leads to, from the room node it sits in
+        for secret_tile in secret_destinations:
+            host_room : str|None = index[secret_tile].host_room
+            if host_room is None:
+                continue
+            for x,y in index[secret_tile].tiles:
+                self.node_index[y,x] = self.room_node(host_room)
+            self.secret_passages[self.room_node(host_room)] = self.room_node(secret_destinations[secret_tile])
+        table_rows : int = self.num_nodes if self.num_nodes<=max_table_nodes else len(room_tiles)
+        if distances is None or distances.shape!=(table_rows,self.num_nodes): #a table from a stale cache is rebuilt
+            distances = self.calculate_distances()
+        self.distances : np.ndarray = distances #distances[a,b] is the number of steps between node a and node b, the rows are only the rooms on large boards
+        self.all_pairs : bool = len(distances)==self.num_nodes #whether every node has a row
+        self.room_distances : np.ndarray = distances[self.num_tile_nodes:] if self.all_pairs==True else distances #room_distances[r,n] is the number of steps between room r and node n, walking either way
+        self.reachable_cache : dict[tuple[int,int],tuple[tuple[tuple[int,int],...],tuple[str,...]]] = {} #answers to reachable, filled as they are asked
+
+    #positions directly above, below, left and right of a position which are on the board
+    def neighbours(self,x : int,y : int):
+        found : list[tuple[int,int]] = []
+        for neighbour_x,neighbour_y in ((x,y-1),(x,y+1),(x-1,y),(x+1,y)):
+            if neighbour_x>=0 and neighbour_x<self.board_width and neighbour_y>=0 and neighbour_y<self.board_height:
+                found.append((neighbour_x,neighbour_y))
+        return found
+
+    #list the nodes one step away from each node, walkable tiles next to a room tile are its doors
+    def create_edges(self):
+        self.edges : list[list[int]] = [[] for node in range(self.num_nodes)]
+        for node,(x,y) in enumerate(self.tile_positions):
+            for neighbour_x,neighbour_y in self.neighbours(x,y):
+                neighbour_node : int = int(self.node_index[neighbour_y,neighbour_x])
+                if neighbour_node<0 or neighbour_node in self.edges[node]:
+                    continue
+                self.edges[node].append(neighbour_node)
+                if neighbour_node>=self.num_tile_nodes:
+                    self.edges[neighbour_node].append(node) #doors work in both directions
+
+    #breadth first search from every node, or only from the rooms on boards with more than max_table_nodes nodes
+    def calculate_distances(self):
+        if self.num_nodes>max_table_nodes:
+            room_distances : np.ndarray = np.full((len(room_tiles),self.num_nodes),unreachable,dtype=np.uint16)
+            for room_number in range(len(room_tiles)):
+                reached : dict[int,int] = self.walk(self.num_tile_nodes+room_number,unreachable-1)
+                room_distances[room_number,list(reached.keys())] = list(reached.values())
+            return room_distances
+        return self.calculate_all_distances()
+
+    #breadth first search from every node at once, a step at a time, each node holding one bit per source in a packed array
+    #the step each node is reached at is written into bit planes, so the bits are only unpacked once at the end
+    def calculate_all_distances(self):
+        num_sources : int = self.num_nodes
+        #the nodes next to each node, padded with an extra node which is never reached
+        max_degree : int = max([len(neighbours) for neighbours in self.edges]+[1])
+        neighbour_table : np.ndarray = np.full((self.num_nodes,max_degree),self.num_nodes,dtype=np.int32)
+        for node,neighbours in enumerate(self.edges):
+            neighbour_table[node,:len(neighbours)] = neighbours
+        frontier : np.ndarray = np.packbits(np.eye(self.num_nodes+1,num_sources,dtype=bool),axis=1) #bits of the searches which reached each node on the last step
+        reached : np.ndarray = frontier.copy()
+        planes : list[np.ndarray] = [] #planes[k] holds the bits of the searches which reached each node on a step with bit k set
+        distance : int = 0
+        while distance<unreachable-1:
+            distance = distance + 1
+            stepped : np.ndarray = np.bitwise_or.reduce(frontier[neighbour_table],axis=1)
+            stepped &= ~reached[:self.num_nodes]
+            if stepped.any()==False:
+                break
+            reached[:self.num_nodes] |= stepped
+            while len(planes)<distance.bit_length():
+                planes.append(np.zeros_like(stepped))
+            for bit,plane in enumerate(planes):
+                if distance>>bit & 1:
+                    plane |= stepped
+            stepped[self.num_tile_nodes:] = 0 #cannot walk through a room
+            frontier[:self.num_nodes] = stepped
+        distances : np.ndarray = np.zeros((num_sources,self.num_nodes),dtype=np.uint16)
+        for bit,plane in enumerate(planes):
+            distances |= np.unpackbits(plane,axis=1,count=num_sources).T.astype(np.uint16)<<bit
+        distances[np.unpackbits(reached[:self.num_nodes],axis=1,count=num_sources).T==0] = unreachable
+        return distances
+
+    #breadth first search from a node out to a number of steps, paths stop when they enter a room
+    #returns the number of steps to each node reached, including the source at 0
+    def walk(self,source : int,max_distance : int):
+        reached : dict[int,int] = {source : 0}
+        frontier : list[int] = [source]
+        distance : int = 0
+        while len(frontier)>0 and distance<max_distance:
+            distance = distance + 1
+            new_frontier : list[int] = []
+            for node in frontier:
+                if node>=self.num_tile_nodes and node!=source: #cannot walk through a room
+                    continue
+                for neighbour in self.edges[node]:
+                    if neighbour not in reached:
+                        reached[neighbour] = distance
+                        new_frontier.append(neighbour)
+            frontier = new_frontier
+        return reached
+
+    #the node of a room
+    def room_node(self,room : str):
+        return self.num_tile_nodes+room_tiles.index(room)
+
+    #the node of the tile at a position, rooms and their secret passages give the room's node
+    def node_at(self,x : int,y : int):
+        return int(self.node_index[y,x])
+
+    #the number of steps to walk from one node to another
+    #a lookup on small boards, on large boards only distances to and from rooms are, and others are a search
+    def distance(self,source : int,target : int):
+        if self.all_pairs==True:
+            return int(self.distances[source,target])
+        if target>=self.num_tile_nodes:
+            return int(self.room_distances[target-self.num_tile_nodes,source])
+        if source>=self.num_tile_nodes:
+            return int(self.room_distances[source-self.num_tile_nodes,target])
+        return self.walk(source,unreachable-1).get(target,unreachable)
+
+    #the tiles and rooms a player on a node can move to with a roll
+    #players move up to the rolled number of steps, and can take a secret passage out of a room instead of walking
+    #the answer is shared between callers, so it must not be modified
+    def reachable(self,source : int,roll : int):
+        key : tuple[int,int] = (source,roll)
+        if key in self.reachable_cache:
+            return self.reachable_cache[key]
+        reached : list[int] = sorted(node for node in self.walk(source,roll) if node!=source)
+        tile_nodes : list[int] = [node for node in reached if node<self.num_tile_nodes]
+        room_nodes : list[int] = [node for node in reached if node>=self.num_tile_nodes]
+        if source in self.secret_passages and self.secret_passages[source] not in room_nodes:
+            room_nodes.append(self.secret_passages[source])
+        answer : tuple[tuple[tuple[int,int],...],tuple[str,...]] = (tuple(self.tile_positions[node] for node in tile_nodes),tuple(room_tiles[node-self.num_tile_nodes] for node in room_nodes))
+        self.reachable_cache[key] = answer
+        return answer
+
+
+#movement graphs already built in this process, keyed by the board they describe
+built_graphs : dict[bytes,MovementGraph] = {}
+
+#the movement graph of a board, built once per process and shared between games
+def get_movement_graph(board_values : np.ndarray):
+    key : bytes = str(board_values.shape).encode()+board_values.tobytes()
+    if key not in built_graphs:
+        built_graphs[key] = MovementGraph(board_values)
+    return built_graphs[key]
+
+#the movement graph of a board file, reading the distance table from the disk cache when the board has not changed
+def load_movement_graph(board_path : str,board_values : np.ndarray|None = None):
+    board_hash : str|None = None #the board file is hashed once, for both caches
+    if board_values is None:
+        board_hash = board_file_hash(board_path)
+        board_values,board_size = load_board(board_path,board_hash)
+    key : bytes = str(board_values.shape).encode()+board_values.tobytes()
+    if key in built_graphs:
+        return built_graphs[key]
+    table_path : str = cache_path(board_path,'movement_v'+str(cache_version),'.npy',board_hash)
+    distances : np.ndarray|None = None
+    try:
+        distances = np.load(table_path)
+    except (OSError,ValueError,EOFError):
+        distances = None #no cache, or one which can not be read, so build the table
+    graph : MovementGraph = MovementGraph(board_values,distances)
+    if graph.distances is not distances: #the graph built its own table, so cache it
+        try:
+            save_cache_file(table_path,graph.distances) #written to a temporary file and renamed, so a half written table is never loaded
+        except OSError:
+            pass #the table is built again next time
+    built_graphs[key] = graph
+    return graph
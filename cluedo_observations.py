@@ -0,0 +1,118 @@
+#this file turns the state of games into fixed shape numpy arrays, for bots which learn to play
+#the arrays of every game live in one set of buffers with the game as the first axis, so a batch of games needs no copying
+#each game's arrays are views of its slot in the buffers, and are updated in place after each turn
+#only what has changed since the last update is rewritten, so an update takes a few microseconds
+
+import numpy as np
+from cluedo_engine import GameEngine,all_cards,player_rep_cards
+from cluedo_deduction import Knowledge
+
+#constants
+num_cards : int = len(all_cards)
+num_seats : int = len(player_rep_cards)
+num_owners : int = num_seats+1 #the seats, then the murder envelope
+
+#the bits of a card mask as an array of 0s and 1s, in the order of all_cards
+def mask_to_array(mask : int):
+    return np.unpackbits(np.frombuffer(mask.to_bytes(4,'little'),dtype=np.uint8),bitorder='little')[:num_cards]
+
+
+#the observations of num_games games, the board is shared by every game
+#tokens      (games,seats,height,width) uint8, 1 on the tile each seat's token is on
+#positions   (games,seats,2) int16, x,y of each seat's token, -1 if it is not on the board
+#hand        (games,cards) uint8, 1 for the cards in the observing seat's hand
+#knowledge   (games,owners,cards) int8, 1 if the owner is known to hold the card, -1 if known not to, 0 if unknown
+#status      (games,4) int16, the observing seat, the seat to play, the turn number and whether the game is over
+class ObservationBuffers():
+    def __init__(self,num_games : int,board_values : np.ndarray):
+        height,width = board_values.shape
+        self.num_games : int = num_games
+        self.board : np.ndarray = board_values #the tile value of each position, shared rather than copied
+        self.tokens : np.ndarray = np.zeros((num_games,num_seats,height,width),dtype=np.uint8)
+        self.positions : np.ndarray = np.full((num_games,num_seats,2),-1,dtype=np.int16)
+        self.hand : np.ndarray = np.zeros((num_games,num_cards),dtype=np.uint8)
+        self.knowledge : np.ndarray = np.zeros((num_games,num_owners,num_cards),dtype=np.int8)
+        self.status : np.ndarray = np.zeros((num_games,4),dtype=np.int16)
+        self.encoders : list[ObservationEncoder] = [ObservationEncoder(self,slot) for slot in range(num_games)]
+
+    #update the observation of every game, engines and knowledges hold each slot's game and the observing seat's knowledge
+    def update(self,engines : list[GameEngine],knowledges : list[Knowledge|None]):
+        for encoder,engine,knowledge in zip(self.encoders,engines,knowledges):
+            encoder.update(engine,knowledge)
+
+    #the batched arrays, without copying
+    def arrays(self):
+        return {'board' : self.board,'tokens' : self.tokens,'positions' : self.positions,'hand' : self.hand,
+                'knowledge' : self.knowledge,'status' : self.status}
+
+
+#writes the observation of one seat in one game into its slot of the buffers
+class ObservationEncoder():
+    def __init__(self,buffers : ObservationBuffers,slot : int):
+        self.buffers : ObservationBuffers = buffers
+        self.slot : int = slot
+        #views of this game's slot
+        self.tokens : np.ndarray = buffers.tokens[slot]
+        self.positions : np.ndarray = buffers.positions[slot]
+        self.hand : np.ndarray = buffers.hand[slot]
+        self.knowledge : np.ndarray = buffers.knowledge[slot]
+        self.status : np.ndarray = buffers.status[slot]
+        #the masks the knowledge array was last written from, so unchanged owners can be skipped
+        self.has : list[int] = [0]*num_owners
+        self.lacks : list[int] = [0]*num_owners
+        self.seat : int = -1
+        self.drawn_positions : list[list[int]] = [[-1,-1] for seat in range(num_seats)] #the positions the tokens array was last written from
+
+    #write the whole observation for a seat at the start of a game
+    def reset(self,engine : GameEngine,seat : int,knowledge : Knowledge|None = None):
+        self.seat = seat
+        self.tokens[:] = 0
+        self.positions[:] = -1
+        self.drawn_positions = [[-1,-1] for seat in range(num_seats)]
+        self.knowledge[:] = 0
+        self.has = [0]*num_owners
+        self.lacks = [0]*num_owners
+        self.hand[:] = mask_to_array(engine.card_controller.hand_masks[seat])
+        self.update(engine,knowledge)
+
+    #rewrite what has changed since the last update
+    def update(self,engine : GameEngine,knowledge : Knowledge|None = None):
+        #tokens which have moved
+        positions : list[list[int]] = engine.player_positions.positions.tolist()
+        if positions!=self.drawn_positions:
+            for seat,((old_x,old_y),(x,y)) in enumerate(zip(self.drawn_positions,positions)):
+                if old_x==x and old_y==y:
+                    continue
+                if old_x>=0:
+                    self.tokens[seat,old_y,old_x] = 0
+                if x>=0:
+                    self.tokens[seat,y,x] = 1
+            np.copyto(self.positions,engine.player_positions.positions)
+            self.drawn_positions = positions
+        #cards whose owner has been narrowed down, facts are only ever added during a game so only the new ones are written
+        if knowledge is not None:
+            for owner in range(num_owners):
+                has : int = knowledge.has[owner]
+                lacks : int = knowledge.lacks[owner]
+                if has==self.has[owner] and lacks==self.lacks[owner]:
+                    continue
+                if self.has[owner] & ~has or self.lacks[owner] & ~lacks: #a different knowledge object, so write the owner from scratch
+                    self.knowledge[owner] = mask_to_array(has).view(np.int8)-mask_to_array(lacks).view(np.int8)
+                else:
+                    self.write_bits(owner,has & ~self.has[owner],1)
+                    self.write_bits(owner,lacks & ~self.lacks[owner],-1)
+                self.has[owner] = has
+                self.lacks[owner] = lacks
+        self.status[:] = (self.seat,engine.current_seat,min(engine.turn_number,32767),engine.game_over)
+
+    #set an owner's entry for each card in a mask
+    def write_bits(self,owner : int,mask : int,value : int):
+        while mask:
+            bit : int = mask & -mask
+            self.knowledge[owner,bit.bit_length()-1] = value
+            mask = mask ^ bit
+
+    #this game's arrays, without copying
+    def arrays(self):
+        return {'board' : self.buffers.board,'tokens' : self.tokens,'positions' : self.positions,'hand' : self.hand,
+                'knowledge' : self.knowledge,'status' : self.status}
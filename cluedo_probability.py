@@ -0,0 +1,237 @@
+#this file works out how likely each card is to be in the murder envelope, given what a player knows
+#every deal consistent with the knowledge is equally likely, so the probability is the share of consistent deals
+#the deals are counted exactly when that is quick enough, otherwise they are sampled
+
+import time
+import numpy as np
+from cluedo_engine import CardController,SuggestionResult,all_cards,room_cards,weapon_cards,player_rep_cards
+from cluedo_deduction import Knowledge,card_bits,category_masks,num_cards
+
+#constants
+max_exact_states : int = 200000 #estimated number of counting states above which sampling is used instead
+deadline_check_interval : int = 1024 #how many counting steps between checks of the time budget
+
+#raised internally when exact counting runs out of time
+class OutOfTime(Exception):
+    pass
+
+
+#the chance of each card being in the envelope, and how it was worked out
+class SolutionEstimate():
+    def __init__(self,probabilities : dict[str,float],method : str,deals : float):
+        self.probabilities : dict[str,float] = probabilities #chance of each card being a murder card
+        self.method : str = method #'exact' or 'sampled'
+        self.deals : float = deals #number of consistent deals counted, or accepted samples
+
+    #the most likely (suspect,weapon,room)
+    def most_likely(self):
+        best : list[str] = [max(cards,key=lambda card: self.probabilities[card]) for cards in (player_rep_cards,weapon_cards,room_cards)]
+        return best[0],best[1],best[2]
+
+
+#the knowledge a seat has after the deal and a list of suggestions
+#the seat only sees the card shown for its own suggestions
+def knowledge_from_history(card_controller : CardController,seat : int,history : list[SuggestionResult]):
+    knowledge : Knowledge = Knowledge.for_seat(card_controller,seat)
+    for result in history:
+        shown_card : str|None = result.shown_card if result.suggester==seat else None
+        knowledge.observe_suggestion(result.suggester,[result.suspect,result.weapon,result.room],result.refuter,shown_card)
+    return knowledge
+
+#the chance of each card being in the envelope
+#exact counting is tried first if it looks small enough, and sampling fills the rest of the time budget (seconds) if it does not finish
+def solution_probabilities(knowledge : Knowledge,time_budget : float = 0.05,rng : np.random.Generator|None = None):
+    deadline : float = time.perf_counter()+time_budget
+    counter : ExactCounter = ExactCounter(knowledge,deadline)
+    if counter.estimated_states<=max_exact_states:
+        try:
+            return counter.count()
+        except OutOfTime:
+            pass #fall back to sampling
+    if rng is None:
+        rng = np.random.default_rng()
+    return DealSampler(knowledge,rng).sample(deadline)
+
+
+#counts consistent deals by going through the cards whose owner is unknown, one at a time
+#the envelope is treated as one more owner which takes one card of each type, so cards are visited type by type
+#the count from each state onwards is memoized, and a forward pass gives each card's share of the deals
+class ExactCounter():
+    def __init__(self,knowledge : Knowledge,deadline : float):
+        self.knowledge : Knowledge = knowledge
+        self.deadline : float = deadline
+        self.steps : int = 0
+        seats : range = range(knowledge.num_seats)
+        envelope : int = knowledge.envelope
+        known_cards : int = 0
+        for owner in range(knowledge.num_owners):
+            known_cards = known_cards | knowledge.has[owner]
+        #the cards still to place, grouped by type
+        self.cards : list[int] = [i for category in category_masks for i in range(num_cards) if category>>i & 1 and not known_cards>>i & 1]
+        #space left in each seat's hand
+        self.capacity : tuple[int,...] = tuple(knowledge.hand_sizes[seat]-knowledge.has[seat].bit_count() for seat in seats)
+        #the seats allowed to hold each card, and whether the envelope may
+        self.allowed_seats : list[list[int]] = [[seat for seat in seats if not knowledge.lacks[seat]>>card & 1] for card in self.cards]
+        self.envelope_allowed : list[bool] = [not knowledge.lacks[envelope]>>card & 1 for card in self.cards]
+        #the category of each card, and whether the envelope already holds a card of that category
+        self.category : list[int] = [next(c for c,mask in enumerate(category_masks) if mask>>card & 1) for card in self.cards]
+        self.envelope_filled : list[bool] = [knowledge.has[envelope] & mask!=0 for mask in category_masks]
+        self.categories_complete : bool = all(self.envelope_filled[c] or c in self.category for c in range(len(category_masks)))
+        #the sets of cards seats hold at least one of, as bits of a mask of satisfied sets
+        self.clauses : list[tuple[int,int]] = [(seat,mask) for seat in seats for mask in knowledge.one_of[seat]]
+        self.clause_bits : dict[tuple[int,int],int] = {} #sets satisfied by giving a card to a seat, keyed by (position,seat)
+        self.clauses_due : list[int] = [0]*len(self.cards) #sets which must be satisfied once a position has been placed
+        for j,(seat,mask) in enumerate(self.clauses):
+            last_position : int = -1
+            for position,card in enumerate(self.cards):
+                if mask>>card & 1:
+                    self.clause_bits[(position,seat)] = self.clause_bits.get((position,seat),0) | 1<<j
+                    last_position = position
+            if last_position>=0:
+                self.clauses_due[last_position] = self.clauses_due[last_position] | 1<<j
+        #rough size of the state space
+        self.estimated_states : int = len(self.cards)*2*(1<<len(self.clauses))
+        for space in self.capacity:
+            self.estimated_states = self.estimated_states*(max(space,0)+1)
+        self.memo : dict[tuple[int,tuple[int,...],bool,int],int] = {}
+
+    #the states reachable by placing the card at a position, as (next state,placed in envelope)
+    def transitions(self,position : int,capacity : tuple[int,...],filled : bool,satisfied : int):
+        moves : list[tuple[tuple[tuple[int,...],bool,int],bool]] = []
+        for seat in self.allowed_seats[position]:
+            if capacity[seat]>0:
+                new_capacity : tuple[int,...] = capacity[:seat]+(capacity[seat]-1,)+capacity[seat+1:]
+                moves.append(((new_capacity,filled,satisfied | self.clause_bits.get((position,seat),0)),False))
+        if self.envelope_allowed[position] and not filled:
+            moves.append(((capacity,True,satisfied),True))
+        valid_moves : list[tuple[tuple[tuple[int,...],bool,int],bool]] = []
+        for (new_capacity,new_filled,new_satisfied),to_envelope in moves:
+            due : int = self.clauses_due[position]
+            if new_satisfied & due!=due: #a set of cards was passed over without any being given to its seat
+                continue
+            last_of_category : bool = position+1==len(self.cards) or self.category[position+1]!=self.category[position]
+            if last_of_category:
+                if not new_filled: #the envelope needs a card of every type
+                    continue
+                new_filled = position+1<len(self.cards) and self.envelope_filled[self.category[position+1]]
+            valid_moves.append(((new_capacity,new_filled,new_satisfied),to_envelope))
+        return valid_moves
+
+    #the number of ways to place the cards from a position onwards
+    def ways(self,position : int,capacity : tuple[int,...],filled : bool,satisfied : int):
+        if position==len(self.cards):
+            return 1 if all(space==0 for space in capacity) else 0
+        key : tuple[int,tuple[int,...],bool,int] = (position,capacity,filled,satisfied)
+        if key in self.memo:
+            return self.memo[key]
+        self.steps = self.steps + 1
+        if self.steps%deadline_check_interval==0 and time.perf_counter()>self.deadline:
+            raise OutOfTime()
+        total : int = 0
+        for state,to_envelope in self.transitions(position,capacity,filled,satisfied):
+            total = total + self.ways(position+1,*state)
+        self.memo[key] = total
+        return total
+
+    #count the deals, then share them out by which cards end up in the envelope
+    def count(self):
+        envelope_cards : int = self.knowledge.has[self.knowledge.envelope]
+        probabilities : dict[str,float] = {card : 1.0 if envelope_cards & card_bits[card] else 0.0 for card in all_cards}
+        if len(self.cards)==0 or not self.categories_complete:
+            return SolutionEstimate(probabilities,'exact',1 if len(self.cards)==0 else 0)
+        start_filled : bool = self.envelope_filled[self.category[0]]
+        total : int = self.ways(0,self.capacity,start_filled,0)
+        if total==0:
+            return SolutionEstimate(probabilities,'exact',0)
+        #forward pass, keeping the number of ways to reach each state
+        in_envelope : list[int] = [0]*len(self.cards)
+        states : dict[tuple[tuple[int,...],bool,int],int] = {(self.capacity,start_filled,0) : 1}
+        for position in range(len(self.cards)):
+            next_states : dict[tuple[tuple[int,...],bool,int],int] = {}
+            for state,ways_in in states.items():
+                for next_state,to_envelope in self.transitions(position,*state):
+                    if to_envelope==True:
+                        in_envelope[position] = in_envelope[position]+ways_in*self.ways(position+1,*next_state)
+                    next_states[next_state] = next_states.get(next_state,0)+ways_in
+            states = next_states
+        for position,card in enumerate(self.cards):
+            probabilities[all_cards[card]] = in_envelope[position]/total
+        return SolutionEstimate(probabilities,'exact',total)
+
+
+#samples random deals consistent with the cards known to be held, in batches of numpy arrays
+#samples which break any other fact are thrown away, what is left is a uniform sample of the consistent deals
+class DealSampler():
+    def __init__(self,knowledge : Knowledge,rng : np.random.Generator,batch_size : int = 4096):
+        self.knowledge : Knowledge = knowledge
+        self.rng : np.random.Generator = rng
+        self.batch_size : int = batch_size
+        num_owners : int = knowledge.num_owners
+        self.envelope : int = knowledge.envelope
+        #owner of each card, -1 if unknown
+        self.known_owner : np.ndarray = np.full(num_cards,-1,dtype=np.int8)
+        for owner in range(num_owners):
+            for card in range(num_cards):
+                if knowledge.has[owner]>>card & 1:
+                    self.known_owner[card] = owner
+        self.lacks : np.ndarray = np.array([[knowledge.lacks[owner]>>card & 1 for card in range(num_cards)] for owner in range(num_owners)],dtype=bool)
+        #envelope cards still to choose, from the cards of each type with no known owner
+        self.envelope_choices : list[np.ndarray] = []
+        for mask in category_masks:
+            if knowledge.has[self.envelope] & mask==0:
+                self.envelope_choices.append(np.array([card for card in range(num_cards) if mask>>card & 1 and self.known_owner[card]==-1 and not self.lacks[self.envelope,card]]))
+        self.unknown_cards : np.ndarray = np.flatnonzero(self.known_owner==-1)
+        #the seat given each slot of the shuffled unknown cards, filling the space left in each hand
+        slot_owner : list[int] = []
+        for seat in range(knowledge.num_seats):
+            slot_owner = slot_owner+[seat]*(knowledge.hand_sizes[seat]-knowledge.has[seat].bit_count())
+        self.slot_owner : np.ndarray = np.array(slot_owner,dtype=np.int8)
+        self.clauses : list[tuple[int,np.ndarray]] = [(seat,np.array([card for card in range(num_cards) if mask>>card & 1])) for seat in range(knowledge.num_seats) for mask in knowledge.one_of[seat]]
+
+    #a batch of deals, as the owner of each card in each deal, with a flag for each deal saying if it is consistent
+    def sample_batch(self):
+        count : int = self.batch_size
+        owners : np.ndarray = np.tile(self.known_owner,(count,1))
+        remaining : np.ndarray = np.ones((count,num_cards),dtype=bool) #cards not yet given an owner
+        remaining[:,self.known_owner>=0] = False
+        for choices in self.envelope_choices:
+            if len(choices)==0:
+                return owners,np.zeros(count,dtype=bool)
+            chosen : np.ndarray = choices[self.rng.integers(0,len(choices),count)]
+            owners[np.arange(count),chosen] = self.envelope
+            remaining[np.arange(count),chosen] = False
+        #shuffle the remaining cards into the seats' free slots
+        order_keys : np.ndarray = np.where(remaining,self.rng.random((count,num_cards)),2.0)
+        shuffled : np.ndarray = np.argsort(order_keys,axis=1)[:,:len(self.slot_owner)]
+        owners[np.arange(count)[:,None],shuffled] = self.slot_owner[None,:]
+        return owners,self.consistent(owners)
+
+    #which deals, given as the owner of each card, agree with the knowledge
+    #deals are thrown away for moving a known card, giving a card to someone known not to have it, or leaving a set with none given to its seat
+    def consistent(self,owners : np.ndarray):
+        known : np.ndarray = self.known_owner>=0
+        consistent : np.ndarray = (owners[:,known]==self.known_owner[known]).all(axis=1)
+        consistent = consistent & ~self.lacks[owners,np.arange(num_cards)[None,:]].any(axis=1)
+        for seat,cards in self.clauses:
+            consistent = consistent & (owners[:,cards]==seat).any(axis=1)
+        return consistent
+
+    #sample batches until the deadline, with at least one batch
+    def sample(self,deadline : float):
+        in_envelope : np.ndarray = np.zeros(num_cards)
+        accepted : int = 0
+        while True:
+            owners,consistent = self.sample_batch()
+            in_envelope = in_envelope+(owners[consistent]==self.envelope).sum(axis=0)
+            accepted = accepted+int(consistent.sum())
+            if time.perf_counter()>deadline:
+                break
+        if accepted==0: #nothing consistent was found, so spread the chance over the remaining candidates
+            probabilities : dict[str,float] = {}
+            for mask in category_masks:
+                candidates : list[str] = self.knowledge.candidates(mask)
+                for i,card in enumerate(all_cards):
+                    if mask>>i & 1:
+                        probabilities[card] = 1/len(candidates) if card in candidates else 0.0
+            return SolutionEstimate(probabilities,'sampled',0)
+        return SolutionEstimate({card : float(in_envelope[i]/accepted) for i,card in enumerate(all_cards)},'sampled',accepted)
@@ -0,0 +1,153 @@
+#this file times the stages of each frame and turn while the game runs
+#timings are kept as rolling histograms, for the on-screen overlay, and as a list of events which trace viewers can open
+#the profiler starts disabled, and while it is disabled measuring a stage costs one check
+#wrap a stage with: with profiler.measure('display_render'): ...
+
+import collections
+import json
+import math
+import os
+import threading
+import time
+
+#the latencies of the last window samples of one stage, kept as they are and in buckets which double in width for display
+#bucket i holds durations below 2**i microseconds, the last bucket holds everything longer
+class LatencyHistogram():
+    def __init__(self,window : int = 600,num_buckets : int = 24):
+        self.window : int = window
+        self.num_buckets : int = num_buckets
+        self.counts : list[int] = [0]*num_buckets
+        self.samples : collections.deque = collections.deque() #(duration in microseconds,bucket) of each sample in the window
+        self.total : float = 0.0 #sum of the durations in the window
+        self.calls : int = 0 #samples added since the histogram was created
+
+    #add a duration, dropping the oldest sample once the window is full
+    def add(self,duration_us : float):
+        bucket : int = min(int(duration_us).bit_length(),self.num_buckets-1)
+        self.samples.append((duration_us,bucket))
+        self.counts[bucket] = self.counts[bucket] + 1
+        self.total = self.total + duration_us
+        self.calls = self.calls + 1
+        if len(self.samples)>self.window:
+            old_duration,old_bucket = self.samples.popleft()
+            self.counts[old_bucket] = self.counts[old_bucket] - 1
+            self.total = self.total - old_duration
+
+    #the duration below which the given fraction of samples fall, in microseconds
+    #worked out from the samples themselves, the buckets are too coarse, being up to twice as wide as their lower edge
+    def percentile(self,fraction : float):
+        if len(self.samples)==0:
+            return 0.0
+        durations : list[float] = sorted(duration for duration,bucket in self.samples)
+        rank : int = min(max(math.ceil(fraction*len(durations))-1,0),len(durations)-1) #nearest rank
+        return durations[rank]
+
+    def mean(self):
+        if len(self.samples)==0:
+            return 0.0
+        return self.total/len(self.samples)
+
+    def maximum(self):
+        if len(self.samples)==0:
+            return 0.0
+        return max(duration for duration,bucket in self.samples)
+
+
+#times a stage when used in a with statement
+class StageTimer():
+    def __init__(self,profiler,name : str):
+        self.profiler = profiler
+        self.name : str = name
+
+    def __enter__(self):
+        self.start : int = time.perf_counter_ns()
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.profiler.record(self.name,self.start,time.perf_counter_ns())
+        return False
+
+
+#passes calls through to another object, timing each method call as prefix.method
+#used to time the bots' decisions without adding any work to untimed games
+class TimedObject():
+    def __init__(self,target,prefix : str):
+        self.target = target
+        self.prefix : str = prefix
+
+    def __getattr__(self,name : str):
+        attribute = getattr(self.target,name)
+        if not callable(attribute):
+            return attribute
+        stage : str = self.prefix+'.'+name
+        def timed(*args,**kwargs):
+            with profiler.measure(stage):
+                return attribute(*args,**kwargs)
+        return timed
+
+
+#stands in for a StageTimer while the profiler is disabled
+class NullTimer():
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        return False
+
+null_timer : NullTimer = NullTimer()
+
+
+#collects the timings of named stages
+class Profiler():
+    def __init__(self,window : int = 600,trace_limit : int = 200000):
+        self.enabled : bool = False
+        self.window : int = window #samples kept by each histogram
+        self.histograms : dict[str,LatencyHistogram] = {}
+        self.trace : collections.deque = collections.deque(maxlen=trace_limit) #(name,start ns,duration ns,thread) of recent stages
+        self.origin : int = time.perf_counter_ns() #time zero of the exported trace
+
+    #a context manager timing the named stage, which does nothing while disabled
+    def measure(self,name : str):
+        if self.enabled==False:
+            return null_timer
+        return StageTimer(self,name)
+
+    #record a stage which ran between two perf_counter_ns times
+    def record(self,name : str,start : int,end : int):
+        histogram : LatencyHistogram|None = self.histograms.get(name)
+        if histogram is None:
+            histogram = LatencyHistogram(self.window)
+            self.histograms[name] = histogram
+        histogram.add((end-start)/1000)
+        self.trace.append((name,start,end-start,threading.get_ident()))
+
+    #turn profiling on or off, returning whether it is now on
+    def toggle(self):
+        self.enabled = not self.enabled
+        return self.enabled
+
+    #forget everything recorded so far
+    def reset(self):
+        self.histograms = {}
+        self.trace.clear()
+        self.origin = time.perf_counter_ns()
+
+    #a line per stage giving its median, 95th percentile and worst time over the window, in milliseconds
+    def summary(self):
+        lines : list[str] = []
+        for name,histogram in self.histograms.items():
+            lines.append(name+' '+str(round(histogram.percentile(0.5)/1000,2))+' '+str(round(histogram.percentile(0.95)/1000,2))+' '+str(round(histogram.maximum()/1000,2)))
+        return lines
+
+    #write the recorded stages as chrome trace events, which chrome://tracing and perfetto can open
+    def export_trace(self,path : str):
+        process : int = os.getpid()
+        events : list[dict] = [{'name' : name,'ph' : 'X','ts' : (start-self.origin)/1000,'dur' : duration/1000,'pid' : process,'tid' : thread}
+                               for name,start,duration,thread in self.trace]
+        with open(path,'w') as file:
+            json.dump({'traceEvents' : events,'displayTimeUnit' : 'ms'},file)
+        return len(events)
+
+
+#the profiler shared by the game loop, the renderer and the engine
+profiler : Profiler = Profiler()
@@ -0,0 +1,268 @@
+#this file stores finished games in a compact binary format, so very many simulated games can be kept and analysed
+#a set of records is two files: path.games holds one fixed width record per game, path.turns one fixed width record per turn
+#each game record points at its run of turn records, cards are indices into all_cards and seats are indices into player_rep_cards
+#the reader memory maps both files, so records can be filtered and totalled with numpy without loading them all
+#write records with: python cluedo_records.py write games --games 10000 --bots simple deduction
+#and summarise them with: python cluedo_records.py summary games
+
+import argparse
+import os
+import numpy as np
+from cluedo_engine import GameEngine,all_cards,player_rep_cards,card_number
+from cluedo_board_data import load_board
+from cluedo_movement import load_movement_graph
+from cluedo_bots import bot_types
+
+#constants
+envelope_owner : int = len(player_rep_cards) #owner number given to the murder cards
+#the start of each file, the version is raised whenever a record layout changes
+games_magic : bytes = b'CLUEDOG1'
+turns_magic : bytes = b'CLUEDOT2'
+header_size : int = 8
+#one finished game, 43 bytes
+game_dtype : np.dtype = np.dtype([
+    ('seed','<u8'), #seed the game was played from
+    ('first_turn','<u8'), #index of the game's first record in the turns file
+    ('num_turns','<u2'),
+    ('playing','u1'), #bit i is set if seat i played
+    ('winner','i1'), #winning seat, -1 if nobody won
+    ('envelope','u1',(3,)), #murder room, weapon and suspect cards
+    ('owner','u1',(len(all_cards),)), #the seat dealt each card, envelope_owner for the murder cards
+])
+max_coordinate : int = 65535 #largest x or y a turn record can hold
+#one turn of a game, 15 bytes, fields which did not happen that turn are -1
+turn_dtype : np.dtype = np.dtype([
+    ('seat','u1'),
+    ('roll','u1'),
+    ('x','<u2'), #tile the player's token ended the move on
+    ('y','<u2'),
+    ('room','i1'), #card of the room the player was in after moving, -1 in the corridors
+    ('suspect','i1'), #cards suggested
+    ('weapon','i1'),
+    ('refuter','i1'), #seat which refuted the suggestion
+    ('shown','i1'), #card shown to refute it
+    ('accusation','i1',(3,)), #suspect, weapon and room cards accused
+    ('correct','i1'), #1 if the accusation was correct, 0 if it was wrong
+])
+
+#the card index of a card name, -1 for None
+def card_index(card : str|None):
+    if card is None:
+        return -1
+    return card_number[card]
+
+
+#appends games to a set of record files, buffering them so the files are written in large blocks
+#use record_turn as the after_turn argument of GameEngine.play_game, then add the finished game
+class GameWriter():
+    def __init__(self,path : str,buffer_games : int = 4096):
+        self.path : str = path
+        self.buffer_games : int = buffer_games
+        self.turns_file = open_records(path+'.turns',turns_magic,turn_dtype)
+        self.turns_written : int = (self.turns_file.tell()-header_size)//turn_dtype.itemsize #turns already in the file
+        self.games_file = open_records(path+'.games',games_magic,game_dtype,complete_games(path+'.games',self.turns_written))
+        self.games : np.ndarray = np.zeros(buffer_games,dtype=game_dtype)
+        self.num_games : int = 0 #games in the buffer
+        self.turns : list[tuple] = [] #turns in the buffer
+        self.game_turns : list[tuple] = [] #turns of the game being played
+        self.suggestions_seen : int = 0 #suggestions and accusations of the game being played which have been recorded
+        self.accusations_seen : int = 0
+
+    #note what happened in the turn a seat has just played
+    def record_turn(self,engine : GameEngine,seat : int):
+        x,y = engine.player_positions.position(seat)
+        if x<0 or y<0 or x>max_coordinate or y>max_coordinate: #checked before buffering, so the block is not lost at flush
+            raise ValueError('position '+str((x,y))+' of seat '+str(seat)+' does not fit in a turn record')
+        room : str|None = engine.room_of_player(seat)
+        suspect : int = -1
+        weapon : int = -1
+        refuter : int = -1
+        shown : int = -1
+        if self.suggestions_seen<len(engine.history): #the seat made a suggestion this turn
+            suggestion = engine.history[-1]
+            suspect,weapon,refuter,shown = card_index(suggestion.suspect),card_index(suggestion.weapon),suggestion.refuter,card_index(suggestion.shown_card)
+        accusation : tuple[int,int,int] = (-1,-1,-1)
+        correct : int = -1
+        if self.accusations_seen<len(engine.accusations): #the seat made an accusation this turn
+            accuser,accused_suspect,accused_weapon,accused_room,was_correct = engine.accusations[-1]
+            accusation = (card_index(accused_suspect),card_index(accused_weapon),card_index(accused_room))
+            correct = 1 if was_correct==True else 0
+        self.suggestions_seen = len(engine.history)
+        self.accusations_seen = len(engine.accusations)
+        self.game_turns.append((seat,engine.last_roll,x,y,card_index(room),suspect,weapon,refuter,shown,accusation,correct))
+
+    #start recording a game, call before the game is played
+    def start_game(self):
+        self.game_turns = []
+        self.suggestions_seen = 0
+        self.accusations_seen = 0
+
+    #add a finished game and the turns recorded for it
+    def add(self,engine : GameEngine):
+        cards = engine.card_controller
+        record : np.ndarray = self.games[self.num_games]
+        record['seed'] = engine.seed
+        record['first_turn'] = self.turns_written+len(self.turns)
+        record['num_turns'] = len(self.game_turns)
+        record['playing'] = sum(1<<seat for seat,playing in enumerate(cards.player_playing) if playing==True)
+        record['winner'] = engine.winner
+        record['envelope'] = (card_number[cards.murder_room],card_number[cards.murder_weapon],card_number[cards.murder_player])
+        owner : np.ndarray = np.full(len(all_cards),envelope_owner,dtype=np.uint8)
+        for seat,hand in enumerate(cards.player_cards):
+            for card in hand:
+                owner[card_number[card]] = seat
+        record['owner'] = owner
+        self.turns.extend(self.game_turns)
+        self.game_turns = []
+        self.num_games = self.num_games + 1
+        if self.num_games==self.buffer_games:
+            self.flush()
+
+    #play a game with bots and add it
+    def play(self,engine : GameEngine,bots : list,max_turns : int = 1000):
+        self.start_game()
+        engine.play_game(bots,max_turns,self.record_turn)
+        self.add(engine)
+
+    #write out the buffered games and turns
+    def flush(self):
+        if len(self.turns)>0:
+            np.array(self.turns,dtype=turn_dtype).tofile(self.turns_file)
+            self.turns_written = self.turns_written+len(self.turns)
+            self.turns = []
+        self.turns_file.flush()
+        self.games[:self.num_games].tofile(self.games_file)
+        self.games_file.flush()
+        self.num_games = 0
+
+    def close(self):
+        self.flush()
+        self.games_file.close()
+        self.turns_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.close()
+        return False
+
+#open a record file for appending, writing its header if it is new
+#a record cut short by a crash is cut off, as are any records after the first max_records, so new records start on a record boundary
+def open_records(path : str,magic : bytes,dtype : np.dtype,max_records : int|None = None):
+    if os.path.exists(path)==True and os.path.getsize(path)>0:
+        with open(path,'rb') as existing:
+            if existing.read(header_size)!=magic:
+                raise ValueError(path+' is not a cluedo record file of this version')
+        num_records : int = (os.path.getsize(path)-header_size)//dtype.itemsize
+        if max_records is not None:
+            num_records = min(num_records,max_records)
+        os.truncate(path,header_size+num_records*dtype.itemsize)
+    file = open(path,'ab')
+    if file.tell()==0:
+        file.write(magic)
+    return file
+
+#number of games at the start of a games file whose turns are all among the first num_turns turn records, None if there is no file yet
+#the turns are written before the games which point at them, but a crash can still leave games pointing past a cut off turns file
+def complete_games(path : str,num_turns : int):
+    if os.path.exists(path)==False or os.path.getsize(path)<header_size:
+        return None
+    games : np.ndarray = map_records(path,games_magic,game_dtype)
+    past : np.ndarray = np.flatnonzero(games['first_turn']+games['num_turns']>num_turns)
+    num_games : int = len(games) if len(past)==0 else int(past[0])
+    del games #let go of the memory map before the file is cut
+    return num_games
+
+
+#reads a set of record files through memory maps
+class GameRecords():
+    def __init__(self,path : str):
+        self.games : np.ndarray = map_records(path+'.games',games_magic,game_dtype)
+        self.turns : np.ndarray = map_records(path+'.turns',turns_magic,turn_dtype)
+
+    def __len__(self):
+        return len(self.games)
+
+    #the turn records of one game
+    def turns_of(self,game : int):
+        first : int = int(self.games['first_turn'][game])
+        return self.turns[first:first+int(self.games['num_turns'][game])]
+
+    #the cards dealt to each seat in a game, by name
+    def hands_of(self,game : int):
+        owner : np.ndarray = self.games['owner'][game]
+        return [[all_cards[card] for card in np.flatnonzero(owner==seat)] for seat in range(len(player_rep_cards))]
+
+    #the game records in blocks, so totals can be worked out a block at a time
+    def chunks(self,chunk_size : int = 1<<20):
+        for start in range(0,len(self.games),chunk_size):
+            yield self.games[start:start+chunk_size]
+
+    #indices of the games for which condition, given a block of game records, is true
+    #for example records.select(lambda games: games['num_turns']>100)
+    def select(self,condition,chunk_size : int = 1<<20):
+        selected : list[np.ndarray] = [start+np.flatnonzero(condition(chunk)) for start,chunk in zip(range(0,len(self.games),chunk_size),self.chunks(chunk_size))]
+        if len(selected)==0:
+            return np.zeros(0,dtype=np.int64)
+        return np.concatenate(selected)
+
+    #number of games won from each seat, the last entry is games nobody won
+    def winner_counts(self):
+        counts : np.ndarray = np.zeros(len(player_rep_cards)+1,dtype=np.int64)
+        for chunk in self.chunks():
+            counts = counts + np.bincount(chunk['winner'].astype(np.int64)%(len(player_rep_cards)+1),minlength=len(counts))
+        return counts
+
+    #mean number of turns in a game
+    def mean_turns(self):
+        if len(self.games)==0:
+            return 0.0
+        return sum(int(chunk['num_turns'].sum(dtype=np.int64)) for chunk in self.chunks())/len(self.games)
+
+    #number of times each card was shown to refute a suggestion
+    def shown_counts(self,chunk_size : int = 1<<22):
+        counts : np.ndarray = np.zeros(len(all_cards),dtype=np.int64)
+        for start in range(0,len(self.turns),chunk_size):
+            shown : np.ndarray = self.turns['shown'][start:start+chunk_size]
+            counts = counts + np.bincount(shown[shown>=0],minlength=len(all_cards))
+        return counts
+
+#memory map the records in a file, only the complete records are mapped
+def map_records(path : str,magic : bytes,dtype : np.dtype):
+    with open(path,'rb') as file:
+        if file.read(header_size)!=magic:
+            raise ValueError(path+' is not a cluedo record file of this version')
+    num_records : int = (os.path.getsize(path)-header_size)//dtype.itemsize
+    if num_records==0:
+        return np.zeros(0,dtype=dtype)
+    return np.memmap(path,dtype=dtype,mode='r',offset=header_size,shape=(num_records,))
+
+
+#play games between bots and append them to a set of records
+def write_games(path : str,num_games : int,bot_names : list[str],base_seed : int = 0,board_path : str = 'board.csv'):
+    board_values,board_size = load_board(board_path)
+    movement = load_movement_graph(board_path,board_values)
+    active_players : list[str] = player_rep_cards[:len(bot_names)]
+    with GameWriter(path) as writer:
+        for game in range(num_games):
+            engine : GameEngine = GameEngine(board_values,active_players,False,movement,base_seed+game)
+            bots : list = [bot_types[name]() for name in bot_names]+[None]*(engine.num_seats-len(bot_names))
+            writer.play(engine,bots)
+
+def main():
+    parser : argparse.ArgumentParser = argparse.ArgumentParser(description='write and read binary records of cluedo games')
+    parser.add_argument('action',choices=['write','summary'])
+    parser.add_argument('path',help='records are kept in path.games and path.turns')
+    parser.add_argument('--games',type=int,default=1000)
+    parser.add_argument('--bots',nargs='+',default=['simple','deduction'])
+    parser.add_argument('--seed',type=int,default=0)
+    arguments = parser.parse_args()
+    if arguments.action=='write':
+        write_games(arguments.path,arguments.games,arguments.bots,arguments.seed)
+    records : GameRecords = GameRecords(arguments.path)
+    print('games = ',len(records),' turns = ',len(records.turns),' mean turns = ',round(records.mean_turns(),2))
+    print('wins by seat = ',records.winner_counts().tolist())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,429 @@
+#this file lets bots running in other processes play cluedo, many games at once in one asyncio event loop
+#agents connect over a unix socket, or are started by the server and talk over their stdin and stdout
+#messages are single lines of json, every request from the server carries an id which the agent's reply echoes
+#a request also carries the events of the agent's games since it was last sent anything, rather than a message per event
+#agents which do not reply in time get a default decision, so one slow agent cannot stall the other games
+#serve games to agents connecting to a socket with: python cluedo_server.py serve --socket /tmp/cluedo.sock --players 3
+#connect the example agent with: python cluedo_server.py agent --socket /tmp/cluedo.sock
+#or start the agents from the server: python cluedo_server.py serve --agent "python cluedo_server.py agent" --agent "python cluedo_server.py agent"
+
+#messages from the server, each also has 'game' and 'events', and all but start and end have 'id'
+#  start    seat, hand, hand_sizes                     no reply
+#  move     roll, position, tiles, rooms               reply 'move': [x,y], a room name or null
+#  suggest  room                                       reply 'suggest': [suspect,weapon] or null
+#  show     suggester, cards                           reply 'show': one of the cards
+#  accuse                                              reply 'accuse': [suspect,weapon,room] or null
+#  end      winner                                     no reply
+#events are {'event':'suggestion','suggester','cards','refuter'} with 'shown' for the suggester and refuter,
+#and {'event':'accusation','seat','cards','correct'}
+#agents start by sending {'type':'hello','name'}, and are answered with 'welcome', or with 'error' and a message if the hello is not accepted
+
+import argparse
+import asyncio
+import json
+import random
+import shlex
+import sys
+import time
+from cluedo_board_data import load_board
+from cluedo_engine import GameEngine,SuggestionResult,room_cards,weapon_cards,player_rep_cards
+from cluedo_movement import MovementGraph,load_movement_graph
+from cluedo_deduction import Knowledge,room_mask,weapon_mask,suspect_mask
+
+#constants
+protocol_version : int = 1
+
+#write a message as one line of compact json
+def encode(message : dict):
+    return (json.dumps(message,separators=(',',':'))+'\n').encode()
+
+
+#an agent connected to the server
+#outgoing messages are gathered and written once per pass of the event loop, so the messages of many games share a write
+class AgentConnection():
+    def __init__(self,name : str,reader : asyncio.StreamReader,writer : asyncio.StreamWriter,turn_timeout : float):
+        self.name : str = name
+        self.reader : asyncio.StreamReader = reader
+        self.writer : asyncio.StreamWriter = writer
+        self.turn_timeout : float = turn_timeout #seconds the agent has to answer a request
+        self.pending : dict[int,asyncio.Future] = {} #requests waiting for a reply, by id
+        self.next_id : int = 0
+        self.outgoing : list[bytes] = []
+        self.closed : bool = False
+        #totals over every game the agent plays
+        self.requests : int = 0
+        self.timeouts : int = 0
+        self.invalid : int = 0 #replies which could not be used
+        self.response_time : float = 0.0 #seconds spent waiting for replies
+        self.reader_task : asyncio.Task = asyncio.create_task(self.read_replies())
+
+    #queue a message, to be written at the end of this pass of the event loop
+    def send(self,message : dict):
+        if self.closed==True:
+            return
+        if len(self.outgoing)==0:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.outgoing.append(encode(message))
+
+    def flush(self):
+        if len(self.outgoing)>0 and self.closed==False:
+            self.writer.write(b''.join(self.outgoing))
+        self.outgoing = []
+
+    #send a request and wait for the reply, None if the agent did not answer in time
+    async def request(self,message : dict):
+        if self.closed==True: #the agent has gone, so use the default decision straight away
+            return None
+        request_id : int = self.next_id
+        self.next_id = self.next_id + 1
+        message['id'] = request_id
+        future : asyncio.Future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.requests = self.requests + 1
+        start : float = time.perf_counter()
+        self.send(message)
+        try:
+            return await asyncio.wait_for(future,self.turn_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts = self.timeouts + 1
+            return None
+        finally:
+            self.response_time = self.response_time + time.perf_counter() - start
+            del self.pending[request_id]
+
+    #hand each reply to the request waiting for it, replies which arrive too late are dropped
+    async def read_replies(self):
+        while True:
+            try:
+                line : bytes = await self.reader.readline()
+            except ConnectionError: #a reset connection is the agent going too
+                break
+            if len(line)==0:
+                break
+            try:
+                reply : dict = json.loads(line)
+            except ValueError:
+                self.invalid = self.invalid + 1
+                continue
+            future : asyncio.Future|None = self.pending.get(reply.get('id'))
+            if future is not None and future.done()==False:
+                future.set_result(reply)
+        #the agent has gone, so nothing more will be answered
+        self.closed = True
+        for future in self.pending.values():
+            if future.done()==False:
+                future.set_result(None)
+
+    async def close(self):
+        self.flush()
+        self.closed = True
+        self.writer.close()
+        self.reader_task.cancel()
+
+
+#one game played by connected agents
+class RemoteGame():
+    def __init__(self,engine : GameEngine,game_number : int,agents : list[AgentConnection|None]):
+        self.engine : GameEngine = engine
+        self.game_number : int = game_number
+        self.agents : list[AgentConnection|None] = agents #the agent playing each seat, None for seats which are not playing
+        self.events : list[list[dict]] = [[] for agent in agents] #events each seat has not been sent yet
+
+    #add the game number and the seat's unsent events to a message
+    def addressed(self,seat : int,message : dict):
+        message['game'] = self.game_number
+        message['events'] = self.events[seat]
+        self.events[seat] = []
+        return message
+
+    #ask the agent in a seat for a decision, None if it did not give one
+    async def ask(self,seat : int,message : dict):
+        reply : dict|None = await self.agents[seat].request(self.addressed(seat,message))
+        if reply is None:
+            return None
+        return reply.get(message['type'])
+
+    #note a decision which could not be used and fall back to the default
+    def invalid(self,seat : int):
+        self.agents[seat].invalid = self.agents[seat].invalid + 1
+
+    #tell every seat about an event
+    def broadcast(self,event : dict,told_everything : list[int] = []):
+        for seat,agent in enumerate(self.agents):
+            if agent is None:
+                continue
+            if seat in told_everything:
+                self.events[seat].append(event)
+            else:
+                self.events[seat].append({key : value for key,value in event.items() if key!='shown'})
+
+    async def play(self,max_turns : int = 1000):
+        engine : GameEngine = self.engine
+        hand_sizes : list[int] = [len(hand) for hand in engine.card_controller.player_cards]
+        for seat,agent in enumerate(self.agents):
+            if agent is not None:
+                agent.send(self.addressed(seat,{'type' : 'start','seat' : seat,'hand' : engine.card_controller.player_cards[seat],'hand_sizes' : hand_sizes}))
+        while engine.game_over==False and engine.current_seat!=-1 and engine.turn_number<max_turns:
+            await self.play_turn()
+        for seat,agent in enumerate(self.agents):
+            if agent is not None:
+                agent.send(self.addressed(seat,{'type' : 'end','winner' : engine.winner}))
+        return engine.winner
+
+    #the same steps as GameEngine.play_turn, waiting on the agents for each decision
+    async def play_turn(self):
+        engine : GameEngine = self.engine
+        seat : int = engine.current_seat
+        #move
+        roll : int = engine.roll_dice()
+        engine.last_roll = roll
+        reachable_tiles,reachable_rooms = engine.reachable(seat,roll)
+        destination = await self.ask(seat,{'type' : 'move','roll' : roll,'position' : list(engine.player_positions.position(seat)),
+                                           'tiles' : reachable_tiles,'rooms' : reachable_rooms})
+        if isinstance(destination,str) and destination in reachable_rooms:
+            engine.move_to_room(seat,destination)
+        elif isinstance(destination,list) and tuple(destination) in reachable_tiles:
+            engine.move_to_tile(seat,destination[0],destination[1])
+        elif destination is not None:
+            self.invalid(seat)
+        #suggest
+        room : str|None = engine.room_of_player(seat)
+        if room is not None:
+            suggestion = await self.ask(seat,{'type' : 'suggest','room' : room})
+            if isinstance(suggestion,list) and len(suggestion)==2 and suggestion[0] in player_rep_cards and suggestion[1] in weapon_cards:
+                suspect,weapon = suggestion
+                refuter,matching_cards = engine.find_refuter(seat,suspect,weapon,room)
+                shown_card : str|None = None
+                if refuter!=-1:
+                    shown_card = await self.ask(refuter,{'type' : 'show','suggester' : seat,'cards' : matching_cards})
+                    if shown_card is not None and shown_card not in matching_cards:
+                        self.invalid(refuter)
+                        shown_card = None #make_suggestion shows the first matching card
+                result : SuggestionResult = engine.make_suggestion(seat,suspect,weapon,None,shown_card)
+                self.broadcast({'event' : 'suggestion','suggester' : seat,'cards' : [suspect,weapon,room],'refuter' : result.refuter,'shown' : result.shown_card},[seat,result.refuter])
+            elif suggestion is not None:
+                self.invalid(seat)
+        #accuse
+        accusation = await self.ask(seat,{'type' : 'accuse'})
+        if isinstance(accusation,list) and len(accusation)==3 and accusation[0] in player_rep_cards and accusation[1] in weapon_cards and accusation[2] in room_cards:
+            correct : bool = engine.make_accusation(seat,accusation[0],accusation[1],accusation[2])
+            self.broadcast({'event' : 'accusation','seat' : seat,'cards' : accusation,'correct' : correct})
+        elif accusation is not None:
+            self.invalid(seat)
+        engine.end_turn()
+
+
+#plays games between agents, the agents take turns at which seat they sit in
+class AgentServer():
+    def __init__(self,board_path : str = 'board.csv',num_games : int = 100,num_players : int = 3,concurrent_games : int = 64,
+                 turn_timeout : float = 1.0,base_seed : int = 0,max_turns : int = 1000):
+        self.board_values,board_size = load_board(board_path)
+        self.movement : MovementGraph = load_movement_graph(board_path,self.board_values)
+        self.num_games : int = num_games
+        self.num_players : int = num_players
+        self.concurrent_games : int = concurrent_games
+        self.turn_timeout : float = turn_timeout
+        self.base_seed : int = base_seed
+        self.max_turns : int = max_turns
+        self.agents : list[AgentConnection] = []
+        self.wins : dict[str,int] = {}
+        self.games_played : int = 0
+        self.no_winner : int = 0
+        self.elapsed : float = 0.0
+
+    #greet an agent, which introduces itself with a hello message
+    #a ValueError is raised if the hello is wrong, does not come within hello_timeout seconds, or every seat is taken
+    async def add_agent(self,reader : asyncio.StreamReader,writer : asyncio.StreamWriter,hello_timeout : float|None = None):
+        try:
+            hello : dict = json.loads(await asyncio.wait_for(reader.readline(),hello_timeout))
+        except asyncio.TimeoutError:
+            raise ValueError('agents must say hello within '+str(hello_timeout)+' seconds')
+        if isinstance(hello,dict)==False or hello.get('type')!='hello':
+            raise ValueError('agents must start with a hello message')
+        if len(self.agents)>=self.num_players: #checked again after the hello, as other agents may have joined while it was awaited
+            raise ValueError('all '+str(self.num_players)+' agents have already joined')
+        name : str = str(hello.get('name','agent'))+'_'+str(len(self.agents))
+        writer.write(encode({'type' : 'welcome','version' : protocol_version,'name' : name}))
+        self.agents.append(AgentConnection(name,reader,writer,self.turn_timeout))
+        self.wins[name] = 0
+
+    #play one game, the agents are rotated round the seats from game to game
+    async def play_game(self,game_number : int):
+        active_players : list[str] = player_rep_cards[:self.num_players]
+        engine : GameEngine = GameEngine(self.board_values,active_players,False,self.movement,self.base_seed+game_number)
+        agents : list[AgentConnection|None] = [self.agents[(seat+game_number)%self.num_players] if seat<self.num_players else None for seat in range(engine.num_seats)]
+        winner : int = await RemoteGame(engine,game_number,agents).play(self.max_turns)
+        self.games_played = self.games_played + 1
+        if winner==-1:
+            self.no_winner = self.no_winner + 1
+        else:
+            self.wins[agents[winner].name] = self.wins[agents[winner].name] + 1
+
+    #play every game, keeping concurrent_games of them going at once
+    async def play_games(self):
+        game_numbers = iter(range(self.num_games))
+        async def play_in_turn():
+            for game_number in game_numbers:
+                await self.play_game(game_number)
+        start : float = time.perf_counter()
+        await asyncio.gather(*[play_in_turn() for i in range(min(self.concurrent_games,self.num_games))])
+        self.elapsed = time.perf_counter()-start
+        for agent in self.agents:
+            agent.send({'type' : 'bye'})
+            await agent.close()
+
+    #wait for the agents to connect to a unix socket, then play
+    async def serve_socket(self,path : str):
+        all_connected : asyncio.Event = asyncio.Event()
+        async def connected(reader : asyncio.StreamReader,writer : asyncio.StreamWriter):
+            if len(self.agents)>=self.num_players:
+                writer.close()
+                return
+            try:
+                await self.add_agent(reader,writer,self.turn_timeout)
+            except (ValueError,ConnectionError) as error: #turn the agent away, and keep waiting for one which says hello properly
+                writer.write(encode({'type' : 'error','message' : str(error)}))
+                writer.close()
+                return
+            if len(self.agents)==self.num_players:
+                all_connected.set()
+        server : asyncio.AbstractServer = await asyncio.start_unix_server(connected,path,limit=1<<20)
+        async with server:
+            await all_connected.wait()
+            server.close() #no more agents are taken once the games start
+            await self.play_games()
+
+    #start an agent process for each command and talk to it over its stdin and stdout, then play
+    async def serve_processes(self,commands : list[str]):
+        self.num_players = len(commands)
+        processes : list[asyncio.subprocess.Process] = []
+        for command in commands:
+            process : asyncio.subprocess.Process = await asyncio.create_subprocess_exec(*shlex.split(command),stdin=asyncio.subprocess.PIPE,
+                                                                                        stdout=asyncio.subprocess.PIPE,limit=1<<20)
+            processes.append(process)
+            await self.add_agent(process.stdout,process.stdin)
+        await self.play_games()
+        for process in processes:
+            await process.wait()
+
+    #games per second and how each agent did
+    def summary(self):
+        lines : list[str] = ['games = '+str(self.games_played)+' no winner = '+str(self.no_winner)+' games/s = '+str(round(self.games_played/max(self.elapsed,1e-9),1))]
+        for agent in self.agents:
+            mean_response_ms : float = agent.response_time/max(agent.requests,1)*1000
+            lines.append(agent.name+' wins = '+str(self.wins[agent.name])+' requests = '+str(agent.requests)+' timeouts = '+str(agent.timeouts)+
+                         ' invalid = '+str(agent.invalid)+' mean response ms = '+str(round(mean_response_ms,3)))
+        return '\n'.join(lines)
+
+
+#an example agent, which keeps track of the cards it can rule out and heads for rooms which could be the murder room
+#it plays any number of games at once, keeping what it knows about each game separately
+class ExampleAgent():
+    def __init__(self,board_path : str = 'board.csv'):
+        board_values,board_size = load_board(board_path)
+        self.movement : MovementGraph = load_movement_graph(board_path,board_values)
+        self.games : dict[int,tuple[int,Knowledge,random.Random]] = {} #(seat,knowledge,rng) of each game being played
+
+    #the reply to a message, None for messages which do not need one
+    def handle(self,message : dict):
+        message_type : str = message['type']
+        if message_type=='start':
+            knowledge : Knowledge = Knowledge(message['hand_sizes'])
+            knowledge.observe_hand(message['seat'],message['hand'])
+            self.games[message['game']] = (message['seat'],knowledge,random.Random(message['game']))
+        if message_type=='bye':
+            return None
+        seat,knowledge,rng = self.games[message['game']]
+        for event in message['events']:
+            if event['event']=='suggestion':
+                knowledge.observe_suggestion(event['suggester'],event['cards'],event['refuter'],event.get('shown') if event['suggester']==seat else None)
+        if message_type=='end':
+            del self.games[message['game']]
+            return None
+        if message_type=='start':
+            return None
+        reply : dict = {'id' : message['id']}
+        if message_type=='move':
+            reply['move'] = self.choose_move(knowledge,rng,message['tiles'],message['rooms'])
+        elif message_type=='suggest':
+            reply['suggest'] = [rng.choice(knowledge.candidates(suspect_mask)),rng.choice(knowledge.candidates(weapon_mask))]
+        elif message_type=='show':
+            reply['show'] = rng.choice(message['cards'])
+        elif message_type=='accuse':
+            solution : tuple[str,str,str]|None = knowledge.solution()
+            reply['accuse'] = None if solution is None else list(solution)
+        return reply
+
+    #enter a room which could be the murder room, otherwise walk towards the closest one
+    def choose_move(self,knowledge : Knowledge,rng : random.Random,tiles : list[list[int]],rooms : list[str]):
+        candidate_rooms : list[str] = knowledge.candidates(room_mask)
+        if len(rooms)>0:
+            wanted_rooms : list[str] = [room for room in rooms if room in candidate_rooms]
+            return rng.choice(wanted_rooms if len(wanted_rooms)>0 else rooms)
+        if len(tiles)==0:
+            return None
+        room_nodes : list[int] = [self.movement.room_node(room) for room in candidate_rooms]
+        return min(tiles,key=lambda tile: min(self.movement.distance(self.movement.node_at(tile[0],tile[1]),room_node) for room_node in room_nodes))
+
+#run the example agent over a unix socket
+async def run_agent_socket(path : str,name : str):
+    agent : ExampleAgent = ExampleAgent()
+    reader,writer = await asyncio.open_unix_connection(path,limit=1<<20)
+    writer.write(encode({'type' : 'hello','name' : name}))
+    await reader.readline() #welcome
+    while True:
+        line : bytes = await reader.readline()
+        if len(line)==0:
+            break
+        message : dict = json.loads(line)
+        reply : dict|None = agent.handle(message)
+        if reply is not None:
+            writer.write(encode(reply))
+        if message['type']=='bye':
+            break
+    writer.close()
+
+#run the example agent over stdin and stdout
+def run_agent_stdio(name : str):
+    agent : ExampleAgent = ExampleAgent()
+    sys.stdout.buffer.write(encode({'type' : 'hello','name' : name}))
+    sys.stdout.flush()
+    sys.stdin.buffer.readline() #welcome
+    for line in sys.stdin.buffer:
+        message : dict = json.loads(line)
+        reply : dict|None = agent.handle(message)
+        if reply is not None:
+            sys.stdout.buffer.write(encode(reply))
+            sys.stdout.flush()
+        if message['type']=='bye':
+            break
+
+def main():
+    parser : argparse.ArgumentParser = argparse.ArgumentParser(description='play cluedo with agents in other processes')
+    parser.add_argument('action',choices=['serve','agent'])
+    parser.add_argument('--socket',help='unix socket to serve on or connect to, agents use stdin and stdout without one')
+    parser.add_argument('--agent',action='append',default=[],help='command starting an agent which talks over stdin and stdout, once per agent')
+    parser.add_argument('--players',type=int,default=3,help='number of agents to wait for on the socket')
+    parser.add_argument('--games',type=int,default=100)
+    parser.add_argument('--concurrent',type=int,default=64,help='games played at once')
+    parser.add_argument('--timeout',type=float,default=1.0,help='seconds an agent has to answer')
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--name',default='example')
+    arguments = parser.parse_args()
+    if arguments.action=='agent':
+        if arguments.socket is not None:
+            asyncio.run(run_agent_socket(arguments.socket,arguments.name))
+        else:
+            run_agent_stdio(arguments.name)
+        return
+    server : AgentServer = AgentServer('board.csv',arguments.games,arguments.players,arguments.concurrent,arguments.timeout,arguments.seed)
+    if len(arguments.agent)>0:
+        asyncio.run(server.serve_processes(arguments.agent))
+    elif arguments.socket is not None:
+        asyncio.run(server.serve_socket(arguments.socket))
+    else:
+        parser.error('serve needs --socket or at least one --agent')
+    print(server.summary())
+
+if __name__ == '__main__':
+    main()
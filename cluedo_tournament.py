@@ -0,0 +1,128 @@
+#this file plays many games between bots over a pool of worker processes and reports how often each bot wins
+#every game has its own seed, so any game can be replayed exactly
+#run with, for example: python cluedo_tournament.py simple deduction --games 1000 --workers 4
+
+import argparse
+import concurrent.futures
+import math
+import os
+import typing
+from cluedo_board_data import load_board
+from cluedo_engine import GameEngine,player_rep_cards
+from cluedo_movement import load_movement_graph
+from cluedo_bots import bot_types
+
+#the board used by games in this worker process, loaded once when the worker starts
+worker_board : dict[str,typing.Any] = {}
+
+#load the board and its movement graph in a worker process
+def start_worker(board_path : str):
+    board_values,board_size = load_board(board_path)
+    worker_board['board_values'] = board_values
+    worker_board['movement'] = load_movement_graph(board_path,board_values)
+
+
+#the result of one game of a tournament
+class GameOutcome():
+    def __init__(self,game_number : int,seed : int,lineup : list[str],winner : int,turns : int):
+        self.game_number : int = game_number
+        self.seed : int = seed
+        self.lineup : list[str] = lineup #the bot in each playing seat, in seat order
+        self.winner : int = winner #index into lineup of the winner, -1 if nobody won
+        self.turns : int = turns
+
+
+#the seats, bots and seed of a game, bots are rotated round the seats from game to game so no bot always goes first
+def game_setup(game_number : int,bot_names : list[str],base_seed : int):
+    shift : int = game_number%len(bot_names)
+    lineup : list[str] = bot_names[shift:]+bot_names[:shift]
+    seed : int = base_seed*1000003+game_number
+    return lineup,seed
+
+#play one game with the board already loaded in this process
+def play_game(game_number : int,bot_names : list[str],base_seed : int,max_turns : int):
+    lineup,seed = game_setup(game_number,bot_names,base_seed)
+    active_players : list[str] = player_rep_cards[:len(lineup)]
+    engine : GameEngine = GameEngine(worker_board['board_values'],active_players,False,worker_board['movement'],seed)
+    bots : list = [bot_types[name]() for name in lineup]+[None]*(engine.num_seats-len(lineup))
+    winner : int = engine.play_game(bots,max_turns)
+    return GameOutcome(game_number,seed,lineup,winner,engine.turn_number)
+
+#play a run of games in a worker, batching them keeps the cost of talking to the worker small
+def play_games(game_numbers : range,bot_names : list[str],base_seed : int,max_turns : int):
+    return [play_game(game_number,bot_names,base_seed,max_turns) for game_number in game_numbers]
+
+#play games over a pool of processes, yielding each outcome as soon as its batch finishes
+def stream_tournament(bot_names : list[str],num_games : int,workers : int|None = None,base_seed : int = 0,
+                      board_path : str = 'board.csv',max_turns : int = 1000,batch_size : int = 50):
+    for name in bot_names:
+        if name not in bot_types:
+            raise ValueError('unknown bot '+name+', choose from '+str(list(bot_types)))
+    if len(bot_names)<1 or len(bot_names)>len(player_rep_cards):
+        raise ValueError('a game needs between 1 and '+str(len(player_rep_cards))+' bots')
+    load_movement_graph(board_path) #build the disk caches once before the workers start
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers,initializer=start_worker,initargs=(board_path,)) as executor:
+        batches : list[concurrent.futures.Future] = [executor.submit(play_games,range(start,min(start+batch_size,num_games)),bot_names,base_seed,max_turns)
+                                                     for start in range(0,num_games,batch_size)]
+        for batch in concurrent.futures.as_completed(batches):
+            for outcome in batch.result():
+                yield outcome
+
+#replay a single game of a tournament in this process, for example to look at an interesting result
+def replay_game(game_number : int,bot_names : list[str],base_seed : int = 0,board_path : str = 'board.csv',max_turns : int = 1000):
+    start_worker(board_path)
+    return play_game(game_number,bot_names,base_seed,max_turns)
+
+
+#win rates of each type of bot, with 95% wilson score confidence intervals
+class TournamentResults():
+    def __init__(self):
+        self.games : int = 0
+        self.no_winner : int = 0 #games which hit the turn limit or where everyone accused wrongly
+        self.seats : dict[str,int] = {} #number of seats each type of bot has played in
+        self.wins : dict[str,int] = {}
+
+    #add the outcome of a game
+    def add(self,outcome : GameOutcome):
+        self.games = self.games + 1
+        for name in outcome.lineup:
+            self.seats[name] = self.seats.get(name,0)+1
+            self.wins.setdefault(name,0)
+        if outcome.winner==-1:
+            self.no_winner = self.no_winner + 1
+        else:
+            winner_name : str = outcome.lineup[outcome.winner]
+            self.wins[winner_name] = self.wins[winner_name]+1
+
+    #the share of seats won by a type of bot, with the low and high ends of its confidence interval
+    def win_rate(self,name : str,z : float = 1.96):
+        n : int = self.seats[name]
+        rate : float = self.wins[name]/n
+        centre : float = (rate+z*z/(2*n))/(1+z*z/n)
+        spread : float = z*math.sqrt(rate*(1-rate)/n+z*z/(4*n*n))/(1+z*z/n)
+        return rate,centre-spread,centre+spread
+
+    #one line per type of bot
+    def summary(self):
+        lines : list[str] = ['games = '+str(self.games)+' no winner = '+str(self.no_winner)]
+        for name in self.seats:
+            rate,low,high = self.win_rate(name)
+            lines.append(name+' win rate per seat = '+str(round(rate,4))+' (95% ci '+str(round(low,4))+' to '+str(round(high,4))+')')
+        return '\n'.join(lines)
+
+
+def main():
+    parser : argparse.ArgumentParser = argparse.ArgumentParser(description='play cluedo bots against each other')
+    parser.add_argument('bots',nargs='+',help='bot in each seat, from '+str(list(bot_types)))
+    parser.add_argument('--games',type=int,default=1000)
+    parser.add_argument('--workers',type=int,default=os.cpu_count())
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--board',default='board.csv')
+    arguments = parser.parse_args()
+    results : TournamentResults = TournamentResults()
+    for outcome in stream_tournament(arguments.bots,arguments.games,arguments.workers,arguments.seed,arguments.board):
+        results.add(outcome)
+    print(results.summary())
+
+if __name__ == '__main__':
+    main()